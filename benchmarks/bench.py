@@ -0,0 +1,253 @@
+"""
+Benchmark the PyMdown plugin's conversion pipeline outside of Sublime.
+
+Uses stubbed `sublime`/`sublime_plugin` modules and a fake `pymdown` binary
+(so the numbers reflect the plugin, not Python Markdown), generates synthetic
+Markdown of increasing size, and reports latency percentiles for each stage
+of a buffer conversion and the throughput of batch conversions.
+
+    python benchmarks/bench.py [--sizes 1000,10000,50000] [--runs 20] [--files 200]
+
+The fake binary is run through a generated script with a shebang line,
+so the benchmark only runs on Linux and OSX.
+"""
+import argparse
+import importlib
+import os
+import random
+import shutil
+import stat
+import sys
+import tempfile
+import time
+import types
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, os.path.join(HERE, 'stubs'))
+sys.path.insert(0, ROOT)
+
+import sublime  # noqa: E402
+from lib.stats import percentile  # noqa: E402
+
+WORDS = (
+    'lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor '
+    'incididunt ut labore et dolore magna aliqua markdown preview convert render'
+).split()
+
+
+def load_plugin():
+    """Import the plugin as a package so its relative imports work."""
+
+    package = types.ModuleType('PyMdown')
+    package.__path__ = [ROOT]
+    sys.modules['PyMdown'] = package
+    return importlib.import_module('PyMdown.pymdown')
+
+
+def make_binary(folder):
+    """Create an executable fake `pymdown` binary."""
+
+    path = os.path.join(folder, 'pymdown')
+    with open(os.path.join(HERE, 'fake_pymdown.py'), 'r', encoding='utf-8') as f:
+        source = f.read()
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('#!%s\n' % sys.executable)
+        f.write(source)
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return path
+
+
+def generate(lines, seed=0):
+    """Generate a synthetic Markdown document with roughly the given number of lines."""
+
+    rand = random.Random(seed)
+    out = []
+
+    def sentence():
+        return ' '.join(rand.choice(WORDS) for _ in range(rand.randint(6, 16)))
+
+    while len(out) < lines:
+        kind = rand.randint(0, 9)
+        if kind == 0:
+            out.append('#' * rand.randint(1, 4) + ' ' + sentence().title())
+        elif kind == 1:
+            out.extend('- ' + sentence() for _ in range(rand.randint(2, 6)))
+        elif kind == 2:
+            out.append('```python')
+            out.extend('x = "%s"' % sentence() for _ in range(rand.randint(2, 8)))
+            out.append('```')
+        else:
+            out.extend(
+                sentence() + ' [link](http://example.com/%d) **bold** `code`.' % rand.randint(0, 99)
+                for _ in range(rand.randint(1, 4))
+            )
+        out.append('')
+    return '\n'.join(out[:lines]) + '\n'
+
+
+class View(object):
+
+    """Fake view holding a document."""
+
+    def __init__(self, text):
+        """Initialize."""
+
+        self.text = text
+
+    def id(self):
+        """View id."""
+
+        return 1
+
+    def file_name(self):
+        """Views are unsaved."""
+
+        return None
+
+    def size(self):
+        """Size of the view."""
+
+        return len(self.text)
+
+    def sel(self):
+        """No selections."""
+
+        return []
+
+    def substr(self, region):
+        """Get the text of a region."""
+
+        return self.text[region.begin():region.end()]
+
+    def line(self, region):
+        """Expand a region to full lines."""
+
+        start = self.text.rfind('\n', 0, region.begin()) + 1
+        end = self.text.find('\n', region.end())
+        return sublime.Region(start, len(self.text) if end == -1 else end)
+
+
+def report(name, samples):
+    """Print percentiles of a stage's samples in milliseconds."""
+
+    print(
+        '  %-18s p50 %9.3f  p95 %9.3f  p99 %9.3f  max %9.3f ms' % (
+            name,
+            percentile(samples, 50) * 1000,
+            percentile(samples, 95) * 1000,
+            percentile(samples, 99) * 1000,
+            max(samples) * 1000
+        )
+    )
+
+
+def timed(func, *args):
+    """Run a function and return the result and elapsed seconds."""
+
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def bench_environ(plugin, runs):
+    """Benchmark the environment probe and the cached lookup."""
+
+    probe = []
+    cached = []
+    for _ in range(runs):
+        plugin.PyMdownEnviron.clear()
+        probe.append(timed(plugin.get_environ)[1])
+        cached.append(timed(plugin.get_environ)[1])
+    print('Environment')
+    report('probe', probe)
+    report('cached', cached)
+
+
+def bench_buffer(plugin, lines, runs):
+    """Benchmark each stage of a buffer conversion."""
+
+    text = generate(lines)
+    view = View(text)
+    command = plugin.PyMdownConvertCommand(view)
+    stages = dict((k, []) for k in ('extract', 'encode', 'spawn', 'pipe', 'decode', 'total'))
+    size = 0
+
+    for _ in range(runs):
+        worker = plugin.PyMdownWorker(quiet=True, force_stdout=True, title='Bench')
+        cmd = worker.parse_options()
+
+        buffer, elapsed = timed(command.get_buffer)
+        stages['extract'].append(elapsed)
+        data, elapsed = timed(buffer.encode, 'utf-8')
+        stages['encode'].append(elapsed)
+        size = len(data)
+        p, elapsed = timed(worker.get_process, cmd)
+        stages['spawn'].append(elapsed)
+        (results, errors), elapsed = timed(p.communicate, data)
+        stages['pipe'].append(elapsed)
+        worker.release_process(p)
+        _, elapsed = timed((results + errors).decode, 'utf-8')
+        stages['decode'].append(elapsed)
+
+        worker.buffer = command.get_buffer()
+        _, elapsed = timed(worker.execute_buffer, cmd)
+        stages['total'].append(elapsed)
+
+    print('Buffer: %d lines, %.1f KB' % (lines, size / 1024.0))
+    for name in ('extract', 'encode', 'spawn', 'pipe', 'decode', 'total'):
+        report(name, stages[name])
+    print('  %-18s %.2f MB/s' % ('throughput', size / 1024.0 / 1024.0 / percentile(stages['total'], 50)))
+
+
+def bench_batch(plugin, count, folder):
+    """Benchmark converting a folder of files."""
+
+    docs = os.path.join(folder, 'docs')
+    os.makedirs(docs)
+    for i in range(count):
+        with open(os.path.join(docs, 'doc%04d.md' % i), 'w', encoding='utf-8') as f:
+            f.write(generate(100, seed=i))
+
+    worker = plugin.PyMdownWorker(paths=[docs], batch=True, quiet=True, force=True)
+    worker.cmd = worker.parse_options()
+    err, elapsed = timed(worker.convert_paths)
+    print('Batch: %d files%s' % (count, ' (with errors)' if err else ''))
+    print('  %-18s %9.3f s' % ('total', elapsed))
+    print('  %-18s %.1f files/s' % ('throughput', count / elapsed))
+
+
+def main():
+    """Run the benchmarks."""
+
+    parser = argparse.ArgumentParser(description='Benchmark the PyMdown plugin.')
+    parser.add_argument('--sizes', default='1000,10000,50000', help='Comma separated document sizes in lines.')
+    parser.add_argument('--runs', type=int, default=20, help='Runs per benchmark.')
+    parser.add_argument('--files', type=int, default=200, help='Number of files to batch convert.')
+    args = parser.parse_args()
+
+    os.environ.setdefault('SHELL', '/bin/sh')
+    folder = tempfile.mkdtemp(prefix='pymdown-bench-')
+    try:
+        platform = 'osx' if sys.platform == 'darwin' else 'linux'
+        sublime.SETTINGS['pymdown.sublime-settings'] = {
+            'binary': {platform: make_binary(folder)},
+            'batch_convert_patterns': ['*.md'],
+            'render_cache_size': 0
+        }
+        plugin = load_plugin()
+        plugin.plugin_loaded()
+
+        bench_environ(plugin, args.runs)
+        for lines in [int(x) for x in args.sizes.split(',')]:
+            bench_buffer(plugin, lines, args.runs)
+        if args.files:
+            bench_batch(plugin, args.files, folder)
+        plugin.plugin_unloaded()
+    finally:
+        shutil.rmtree(folder)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
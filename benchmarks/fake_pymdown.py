@@ -0,0 +1,79 @@
+"""
+Fake `pymdown` binary for benchmarking.
+
+Accepts the command line the plugin builds and does a trivial conversion
+(every line is HTML escaped and wrapped in a paragraph) so the benchmark
+measures the plugin and not Python Markdown.
+
+Files are written next to the source as HTML, or to stdout with `--force-stdout`.
+For the tests, files starting with `FAIL` fail to convert (the others are
+still converted), and input starting with `SLEEP <seconds>` starts a child
+process that sleeps that long (writing its pid to `$FAKE_PYMDOWN_PIDFILE`
+if set) and waits for it.
+"""
+import html
+import os
+import subprocess
+import sys
+
+
+def convert(text):
+    """Do a trivial conversion."""
+
+    return ''.join('<p>%s</p>\n' % html.escape(line) for line in text.splitlines())
+
+
+def sleep(text):
+    """Sleep in a child process if the text asks for it."""
+
+    if text.startswith('SLEEP '):
+        seconds = text.split()[1]
+        child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(%s)' % seconds])
+        pidfile = os.environ.get('FAKE_PYMDOWN_PIDFILE')
+        if pidfile:
+            with open(pidfile, 'a') as f:
+                f.write('%d\n' % child.pid)
+        child.wait()
+
+
+def main():
+    """Convert stdin or the file arguments."""
+
+    args = sys.argv[1:]
+    files = []
+    skip = False
+    for i, arg in enumerate(args):
+        if skip:
+            skip = False
+        elif arg in ('--title', '--basepath', '-s'):
+            skip = True
+        elif not arg.startswith('-'):
+            files.append(arg)
+
+    out = sys.stdout
+    status = 0
+    if files:
+        for name in files:
+            with open(name, 'r', encoding='utf-8') as f:
+                text = f.read()
+            sleep(text)
+            if text.startswith('FAIL'):
+                sys.stderr.write('Failed %s\n' % name)
+                status = 1
+                continue
+            if '--force-stdout' in args:
+                out.write(convert(text))
+                continue
+            with open(name.rsplit('.', 1)[0] + '.html', 'w', encoding='utf-8') as f:
+                f.write(convert(text))
+            if '-q' not in args:
+                out.write('Converted %s\n' % name)
+    else:
+        text = sys.stdin.read()
+        sleep(text)
+        out.write(convert(text))
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
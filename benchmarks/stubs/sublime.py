@@ -0,0 +1,126 @@
+"""
+Minimal stand in for Sublime's `sublime` module.
+
+Only what the plugin touches is provided, so it can be benchmarked
+outside of Sublime.  Callbacks scheduled with `set_timeout` run immediately.
+"""
+import os
+import tempfile
+
+# Settings the benchmark hands to the plugin, keyed by settings file name.
+SETTINGS = {}
+
+_cache = tempfile.mkdtemp(prefix='pymdown-bench-cache-')
+
+# The plugin's package is the repository.
+_package = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class Settings(object):
+
+    """Settings object."""
+
+    def __init__(self, values):
+        """Initialize."""
+
+        self.values = values
+
+    def get(self, key, default=None):
+        """Get a setting."""
+
+        return self.values.get(key, default)
+
+    def set(self, key, value):
+        """Set a setting."""
+
+        self.values[key] = value
+
+    def add_on_change(self, key, callback):
+        """Settings change callbacks are never called."""
+
+    def clear_on_change(self, key):
+        """Settings change callbacks are never called."""
+
+
+class Region(object):
+
+    """Region of a view."""
+
+    def __init__(self, a, b=None):
+        """Initialize."""
+
+        self.a = a
+        self.b = a if b is None else b
+
+    def begin(self):
+        """Start of the region."""
+
+        return min(self.a, self.b)
+
+    def end(self):
+        """End of the region."""
+
+        return max(self.a, self.b)
+
+    def size(self):
+        """Size of the region."""
+
+        return self.end() - self.begin()
+
+
+def load_settings(name):
+    """Load settings."""
+
+    return Settings(SETTINGS.setdefault(name, {}))
+
+
+def load_resource(name):
+    """Load a resource of the plugin's package from the repository."""
+
+    parts = name.split('/')
+    if len(parts) < 3 or parts[0] != 'Packages':
+        raise IOError("Resource not found: %s" % name)
+    with open(os.path.join(_package, *parts[2:]), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def cache_path():
+    """Get the cache folder."""
+
+    return _cache
+
+
+def set_timeout(callback, delay=0):
+    """Run the callback immediately."""
+
+    callback()
+
+
+def set_timeout_async(callback, delay=0):
+    """Run the callback immediately."""
+
+    callback()
+
+
+def status_message(msg):
+    """Ignore status messages."""
+
+
+def error_message(msg):
+    """Print error messages."""
+
+    print(msg)
+
+
+def ok_cancel_dialog(msg):
+    """Always accept."""
+
+    return True
+
+
+def set_clipboard(text):
+    """Ignore the clipboard."""
+
+
+def run_command(cmd, args=None):
+    """Ignore commands."""
@@ -0,0 +1,45 @@
+"""Minimal stand in for Sublime's `sublime_plugin` module."""
+
+
+import re
+
+
+class Command(object):
+
+    """Base command."""
+
+    def name(self):
+        """Command name derived from the class name."""
+
+        name = re.sub(r'(?<!^)([A-Z])', r'_\1', self.__class__.__name__).lower()
+        return name[:-8] if name.endswith('_command') else name
+
+
+class ApplicationCommand(Command):
+
+    """Application command."""
+
+
+class WindowCommand(Command):
+
+    """Window command."""
+
+    def __init__(self, window=None):
+        """Initialize."""
+
+        self.window = window
+
+
+class TextCommand(Command):
+
+    """Text command."""
+
+    def __init__(self, view=None):
+        """Initialize."""
+
+        self.view = view
+
+
+class EventListener(object):
+
+    """Event listener."""
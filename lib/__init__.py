@@ -0,0 +1 @@
+"""PyMdown plugin library."""
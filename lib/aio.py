@@ -0,0 +1,144 @@
+"""
+PyMdown asyncio execution backend.
+
+Requires Python 3.5+ (Sublime Text 4).  Importing this module fails on
+older versions, in which case the thread backend is used.
+
+Licensed under MIT
+Copyright (c) 2014 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import asyncio
+from collections import deque
+import codecs
+import subprocess
+import sys
+import threading
+import time
+from .process import ConversionTimeout, kill_process_tree
+
+
+def all_tasks(loop):
+    """Get the tasks of the loop (`asyncio.all_tasks` is new in Python 3.7)."""
+
+    return (getattr(asyncio, 'all_tasks', None) or asyncio.Task.all_tasks)(loop)
+
+
+class AsyncioBackend(object):
+
+    """
+    Run `pymdown` processes as tasks on a single background event loop.
+
+    All processes are multiplexed on one thread instead of a thread per process.
+    The number of processes running at once is limited, and each can be given a timeout.
+    Calls return `concurrent.futures.Future` objects; cancelling one kills its process tree.
+    """
+
+    def __init__(self, limit=4):
+        """Initialize and start the event loop thread."""
+
+        if sys.platform.startswith('win'):
+            self.loop = asyncio.ProactorEventLoop()
+        else:
+            self.loop = asyncio.new_event_loop()
+        self.limit = max(1, limit)
+        self.semaphore = None
+        self.thread = threading.Thread(target=self._serve)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _serve(self):
+        """Run the event loop until stopped, then let the cancelled tasks kill their processes."""
+
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+        tasks = [task for task in all_tasks(self.loop) if not task.done()]
+        if tasks:
+            self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        self.loop.close()
+
+    def stop(self):
+        """Cancel all tasks and stop the event loop."""
+
+        def shutdown():
+            for task in all_tasks(self.loop):
+                task.cancel()
+            self.loop.stop()
+
+        if self.loop.is_running():
+            self.loop.call_soon_threadsafe(shutdown)
+            self.thread.join(5)
+
+    def submit(self, coro):
+        """Run a coroutine on the loop and return a future for its result."""
+
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def communicate(self, cmd, data=None, timeout=None, **kwargs):
+        """Run a process, send it data, and return its return code, stdout, and stderr."""
+
+        return self.submit(self._run(cmd, data, timeout, None, 0, kwargs))
+
+    def stream(self, cmd, on_line, tail_lines=50, timeout=None, **kwargs):
+        """
+        Run a process, passing each line of output to `on_line` as it arrives.
+
+        Returns the return code, the last `tail_lines` lines of output (all if `None`),
+        and how long the process ran.
+        """
+
+        return self.submit(self._run(cmd, None, timeout, on_line, tail_lines, kwargs))
+
+    async def _read_lines(self, stream, on_line, tail):
+        """Decode a stream line by line."""
+
+        decoder = codecs.getincrementaldecoder('utf-8')('replace')
+        while True:
+            raw = await stream.readline()
+            if not raw:
+                break
+            line = decoder.decode(raw)
+            tail.append(line)
+            on_line(line)
+        line = decoder.decode(b'', final=True)
+        if line:
+            tail.append(line)
+            on_line(line)
+
+    async def _run(self, cmd, data, timeout, on_line, tail_lines, kwargs):
+        """Run a process within the concurrency limit."""
+
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.limit)
+        async with self.semaphore:
+            start = time.time()
+            p = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                **kwargs
+            )
+            try:
+                if on_line is None:
+                    results, errors = await asyncio.wait_for(p.communicate(data), timeout)
+                    return p.returncode, results, errors
+
+                tail = deque(maxlen=tail_lines)
+                p.stdin.close()
+                await asyncio.wait_for(
+                    asyncio.gather(
+                        self._read_lines(p.stdout, on_line, tail),
+                        self._read_lines(p.stderr, on_line, tail),
+                        p.wait()
+                    ),
+                    timeout
+                )
+                return p.returncode, ''.join(tail), time.time() - start
+            except asyncio.TimeoutError:
+                kill_process_tree(p.pid)
+                await p.wait()
+                raise ConversionTimeout("Conversion timed out after %.1f seconds!" % timeout)
+            except BaseException:
+                # Cancelled
+                if p.returncode is None:
+                    kill_process_tree(p.pid)
+                    await p.wait()
+                raise
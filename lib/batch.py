@@ -0,0 +1,218 @@
+"""
+PyMdown batch conversion.
+
+Licensed under MIT
+Copyright (c) 2014 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+from concurrent.futures import ThreadPoolExecutor, CancelledError, as_completed
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from .discovery import FileDiscovery
+from .process import ConversionTimeout
+
+WINDOWS = sys.platform.startswith('win')
+
+# Maximum command line length on Windows (in characters).
+WINDOWS_ARG_MAX = 32767
+
+# Used if the system can't tell us its limit.
+DEFAULT_ARG_MAX = 131072
+
+# Room left for anything we don't account for.
+ARG_MAX_HEADROOM = 4096
+
+# Chunks made per worker, so progress is reported often and
+# a worker that finishes early can pick up more work.
+CHUNKS_PER_WORKER = 8
+
+
+def cpu_count():
+    """Get the number of CPU cores."""
+
+    try:
+        return multiprocessing.cpu_count()
+    except NotImplementedError:
+        return 1
+
+
+def arg_length(arg):
+    """Get how much of the command line limit an argument uses."""
+
+    if WINDOWS:
+        # Quotes and a separating space
+        return len(arg) + 3
+    # The string, its null terminator, and its pointer in argv
+    return len(os.fsencode(arg)) + 1 + 8
+
+
+def arg_max(env=None):
+    """
+    Get the room available for a command line.
+
+    On POSIX systems, the environment counts against the limit too.
+    """
+
+    if WINDOWS:
+        return WINDOWS_ARG_MAX - ARG_MAX_HEADROOM
+    try:
+        limit = os.sysconf('SC_ARG_MAX')
+    except (AttributeError, ValueError, OSError):
+        limit = -1
+    if limit <= 0:
+        limit = DEFAULT_ARG_MAX
+    if env is None:
+        env = os.environ
+    limit -= sum(arg_length('%s=%s' % (k, v)) for k, v in env.items())
+    return limit - ARG_MAX_HEADROOM
+
+
+def expand_paths(paths, patterns, discovery=None, ignore=(), recursive=True):
+    """Expand the batch paths into a list of files to convert."""
+
+    if discovery is None:
+        discovery = FileDiscovery()
+    return discovery.find(paths, patterns, ignore, recursive)
+
+
+def chunk_files(files, cmd, limit, chunks=1, max_files=0):
+    """
+    Pack files into chunks that are each converted by a single process.
+
+    Files are spread evenly over at least `chunks` chunks (so every core gets work),
+    but a chunk is never allowed to make the command line longer than `limit`,
+    or to hold more than `max_files` files (if set).  The order of the files is kept.
+    """
+
+    if not files:
+        return []
+    per_chunk = -(-len(files) // max(1, chunks))
+    if max_files > 0:
+        per_chunk = min(per_chunk, max_files)
+    base = sum(arg_length(arg) for arg in cmd)
+
+    result = []
+    current = []
+    length = base
+    for f in files:
+        size = arg_length(f)
+        if current and (len(current) >= per_chunk or length + size > limit):
+            result.append(current)
+            current = []
+            length = base
+        current.append(f)
+        length += size
+    result.append(current)
+    return result
+
+
+class BatchResult(object):
+
+    """
+    Result of converting a chunk of batch files in one process.
+
+    `failed` holds the files of the chunk that failed.  If the process failed,
+    this is every file of the chunk, unless the caller can tell which ones did.
+    """
+
+    def __init__(self, paths, returncode, output, duration):
+        """Initialize."""
+
+        self.paths = paths
+        self.returncode = returncode
+        self.output = output
+        self.duration = duration
+        self.failed = list(paths) if returncode else []
+
+
+def convert_files(
+    files, cmd, execute, workers=0, cancelled=None, limit=None, max_files=0, submit=None, on_result=None
+):
+    """
+    Convert files in parallel.
+
+    Files are packed into chunks that fit on a command line (see `chunk_files`),
+    so process startup is only paid once per chunk.  There are several chunks
+    per worker, so finished chunks (and progress) come in steadily.  Every chunk gets its own
+    argument list (the base command plus the chunk's files), so each file is
+    converted exactly once.  `execute` is called with the argument list and returns
+    the return code and output.  Each call is expected to run its own `pymdown` process,
+    so a pool of threads (sized to the CPU core count by default) keeps that many
+    processes busy.  Results are returned in the order of `files`.  Chunks not yet
+    started when `cancelled()` returns true are skipped.
+
+    Alternatively, `submit` can be given.  It is called with each argument list
+    and returns a `concurrent.futures.Future` for the return code, output, and duration.
+    All chunks are submitted at once, and the submitter is responsible for limiting
+    how many processes run at the same time.
+
+    If `on_result` is given, it is called with each chunk's `BatchResult` as soon as
+    the chunk finishes (from the pool thread that ran it, or the calling thread
+    for submitted chunks).
+    """
+
+    def run(paths):
+        if cancelled is not None and cancelled():
+            return None
+        start = time.time()
+        returncode, output = execute(list(cmd) + paths)
+        result = BatchResult(paths, returncode, output, time.time() - start)
+        if on_result is not None:
+            on_result(result)
+        return result
+
+    if workers <= 0:
+        workers = cpu_count()
+    if limit is None:
+        limit = arg_max()
+    chunks = chunk_files(files, cmd, limit, workers * CHUNKS_PER_WORKER, max_files)
+    if submit is not None:
+        futures = [(c, submit(list(cmd) + c)) for c in chunks]
+        if on_result is None:
+            return collect_futures(futures, cancelled)
+        pending = dict((future, paths) for paths, future in futures)
+        finished = {}
+        for future in as_completed(pending):
+            if cancelled is not None and cancelled():
+                for f in pending:
+                    f.cancel()
+            result = future_result(pending[future], future)
+            if result is not None:
+                on_result(result)
+                finished[future] = result
+        return [finished[future] for paths, future in futures if future in finished]
+    workers = max(1, min(workers, len(chunks)))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run, c) for c in chunks]
+        results = [future.result() for future in futures]
+    return [r for r in results if r is not None]
+
+
+def future_result(paths, future):
+    """Get the `BatchResult` of a submitted chunk (waiting for it), or `None` if it was cancelled."""
+
+    try:
+        returncode, output, duration = future.result()
+    except CancelledError:
+        return None
+    except ConversionTimeout as e:
+        returncode, output, duration = 1, '%s\n' % e, 0.0
+    except Exception:
+        returncode, output, duration = 1, traceback.format_exc(), 0.0
+    return BatchResult(paths, returncode, output, duration)
+
+
+def collect_futures(futures, cancelled=None):
+    """Wait for submitted chunks and collect their results."""
+
+    results = []
+    for paths, future in futures:
+        if cancelled is not None and cancelled():
+            future.cancel()
+        result = future_result(paths, future)
+        if result is not None:
+            results.append(result)
+    return results
@@ -0,0 +1,152 @@
+"""
+PyMdown binary resolution.
+
+Finds the pymdown binary on the PATH and probes its version and the
+options it supports, caching the result until the binary changes.
+
+Licensed under MIT
+Copyright (c) 2014 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import os
+import re
+import shutil
+import subprocess
+import threading
+from .process import kill_process_tree
+
+# Options that older versions of pymdown may not have.
+PROBED_FLAGS = ('--force-stdout', '--critic-dump', '-P')
+
+PROBE_TIMEOUT = 5.0
+
+RE_VERSION = re.compile(r'(\d+(?:\.\d+)+)')
+
+
+class BinaryError(Exception):
+
+    """The pymdown binary is missing or can't do what was asked."""
+
+
+class BinaryInfo(object):
+
+    """A resolved pymdown binary."""
+
+    def __init__(self, path, stamp, version=None, flags=None):
+        """Initialize."""
+
+        self.path = path
+        self.stamp = stamp
+        self.version = version
+        # `None` if the help couldn't be read, in which case every option is assumed to work.
+        self.flags = flags
+
+    def supports(self, flag):
+        """Check if the binary supports an option."""
+
+        return self.flags is None or flag in self.flags
+
+    def check(self, cmd):
+        """Raise `BinaryError` if the command line uses an option the binary doesn't support."""
+
+        for flag in PROBED_FLAGS:
+            if flag in cmd[1:] and not self.supports(flag):
+                raise BinaryError(
+                    "pymdown %s (%s) does not support the '%s' option." % (
+                        self.version or "(unknown version)", self.path, flag
+                    )
+                )
+
+
+def binary_stamp(path):
+    """Get the modification time and size of the binary, or `None` if it is gone."""
+
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime, st.st_size)
+
+
+def run_probe(cmd, env, **popen_kwargs):
+    """Run the binary with the given arguments and return its combined output."""
+
+    p = subprocess.Popen(
+        cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        env=env, **popen_kwargs
+    )
+    try:
+        output = p.communicate(timeout=PROBE_TIMEOUT)[0]
+    except subprocess.TimeoutExpired:
+        kill_process_tree(p.pid)
+        p.communicate()
+        return ''
+    return output.decode('utf-8', 'replace')
+
+
+def probe_binary(path, env, **popen_kwargs):
+    """Probe the version and supported options of the binary."""
+
+    stamp = binary_stamp(path)
+    version = None
+    flags = None
+    try:
+        m = RE_VERSION.search(run_probe([path, '--version'], env, **popen_kwargs))
+        if m:
+            version = m.group(1)
+        usage = run_probe([path, '--help'], env, **popen_kwargs)
+    except OSError as e:
+        raise BinaryError("Could not run the pymdown binary '%s': %s" % (path, str(e)))
+    if 'usage' in usage.lower():
+        flags = frozenset(
+            flag for flag in PROBED_FLAGS
+            if re.search(r'(?<![\w-])%s(?![\w-])' % re.escape(flag), usage)
+        )
+    return BinaryInfo(path, stamp, version, flags)
+
+
+class BinaryResolver(object):
+
+    """
+    Resolve the pymdown binary on the PATH and cache what it supports.
+
+    The lookup is remembered per binary setting and PATH,
+    and the probe per binary path until its modification time or size changes.
+    """
+
+    def __init__(self):
+        """Initialize."""
+
+        self.lock = threading.Lock()
+        self.paths = {}
+        self.binaries = {}
+
+    def clear(self):
+        """Forget all resolved binaries."""
+
+        with self.lock:
+            self.paths.clear()
+            self.binaries.clear()
+
+    def resolve(self, name, env, **popen_kwargs):
+        """Get the `BinaryInfo` of a binary, raising `BinaryError` if it can't be found."""
+
+        if not name:
+            raise BinaryError("No pymdown binary is configured for this platform.")
+        search = env.get('PATH', os.defpath)
+        key = (name, search)
+        with self.lock:
+            path = self.paths.get(key)
+            info = self.binaries.get(path) if path is not None else None
+        stamp = binary_stamp(path) if path is not None else None
+        if info is not None and info.stamp == stamp:
+            return info
+
+        if stamp is None:
+            path = shutil.which(name, path=search)
+            if path is None:
+                raise BinaryError("Could not find the pymdown binary '%s' on the PATH." % name)
+        info = probe_binary(path, env, **popen_kwargs)
+        with self.lock:
+            self.paths[key] = path
+            self.binaries[path] = info
+        return info
@@ -0,0 +1,236 @@
+"""
+PyMdown partial rendering.
+
+Splits a Markdown document into top-level blocks and caches the HTML
+of each block, so only changed blocks are sent to PyMdown.
+
+Licensed under MIT
+Copyright (c) 2014 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+from collections import OrderedDict
+import hashlib
+import re
+import threading
+
+RE_FENCE = re.compile(r'^[ ]{0,3}(`{3,}|~{3,})')
+RE_LIST = re.compile(r'^[ ]{0,3}(?:[*+-]|\d+\.)[ \t]')
+RE_QUOTE = re.compile(r'^[ ]{0,3}>')
+RE_INDENT = re.compile(r'^(?:[ ]{4}|\t)')
+RE_DEFINITION = re.compile(r'^[ ]{0,3}\[([^\]^][^\]]*)\]:[ \t]*\S')
+RE_DEFINITION_CONTINUE = re.compile(r'^[ \t]+["\'(]')
+RE_FRONTMATTER = re.compile(r'^-{3}[ \t]*\n.*?\n(?:-{3}|\.{3})[ \t]*\n', re.DOTALL)
+
+# Constructs whose rendering depends on more than their own block.
+# Documents using them are always rendered in full.
+RE_UNSUPPORTED = re.compile(
+    r'''(?mx)
+    ^[ ]{0,3}\[\^[^\]]+\]:     # footnote definitions
+  | ^[ ]{0,3}\*\[[^\]]+\]:     # abbreviations
+  | ^[ ]{0,3}\[TOC\][ \t]*$    # table of contents
+  | ^[ ]{0,3}<[a-zA-Z!/?]      # raw HTML blocks
+    '''
+)
+
+MARKER = '<!--pymdown-block-%d-->'
+RE_MARKER = re.compile(r'(?:<p>)?<!--pymdown-block-(\d+)-->(?:</p>)?\n?')
+
+
+class Document(object):
+
+    """A Markdown document split into blocks."""
+
+    def __init__(self, frontmatter, blocks, definitions):
+        """Initialize."""
+
+        self.frontmatter = frontmatter
+        self.blocks = blocks
+        self.definitions = definitions
+
+
+def split_blocks(text):
+    """
+    Split a document into frontmatter, top-level blocks, and reference definitions.
+
+    Blocks are separated by blank lines, but fenced code is never split, and indented
+    lines, list items, and block quotes following a blank line stay with the block before.
+    Blocks that only hold reference definitions are collected separately.
+    Returns `None` if the document uses something that can't be rendered in blocks.
+    """
+
+    if RE_UNSUPPORTED.search(text):
+        return None
+
+    frontmatter = ''
+    m = RE_FRONTMATTER.match(text)
+    if m:
+        frontmatter = m.group(0)
+        text = text[m.end():]
+
+    blocks = []
+    current = []
+    fence = None
+    blank = False
+    for line in text.split('\n'):
+        if fence is not None:
+            current.append(line)
+            m = RE_FENCE.match(line)
+            if m and m.group(1)[0] == fence[0] and len(m.group(1)) >= len(fence) and not line.strip(fence[0] + ' \t'):
+                fence = None
+            continue
+
+        if not line.strip():
+            blank = True
+            if current:
+                current.append(line)
+            continue
+
+        if blank and current:
+            first = current[0]
+            if RE_INDENT.match(line):
+                continues = True
+            elif RE_LIST.match(line):
+                continues = RE_LIST.match(first) is not None
+            else:
+                continues = RE_QUOTE.match(line) is not None and RE_QUOTE.match(first) is not None
+            if not continues:
+                blocks.append(current)
+                current = []
+        blank = False
+        current.append(line)
+        m = RE_FENCE.match(line)
+        if m:
+            fence = m.group(1)
+    if current:
+        blocks.append(current)
+
+    content = []
+    definitions = []
+    for block in blocks:
+        lines = [line for line in block if line.strip()]
+        if all(RE_DEFINITION.match(line) or RE_DEFINITION_CONTINUE.match(line) for line in lines):
+            definitions.extend(lines)
+        else:
+            content.append('\n'.join(block).rstrip('\n') + '\n')
+    return Document(frontmatter, content, definitions)
+
+
+def definition_label(line):
+    """Get the lower case label of a reference definition."""
+
+    m = RE_DEFINITION.match(line)
+    return m.group(1).lower() if m else None
+
+
+def used_definitions(block, definitions):
+    """Get the reference definitions a block might use."""
+
+    lower = block.lower()
+    used = []
+    include = False
+    for line in definitions:
+        label = definition_label(line)
+        if label is not None:
+            include = ('[' + label + ']') in lower
+        if include:
+            used.append(line)
+    return used
+
+
+def block_key(prefix, block, definitions):
+    """Get the cache key of a block."""
+
+    h = hashlib.sha1(prefix.encode('utf-8'))
+    h.update(b'\0')
+    h.update(block.encode('utf-8'))
+    for line in definitions:
+        h.update(b'\0')
+        h.update(line.encode('utf-8'))
+    return h.hexdigest()
+
+
+class PartialRenderer(object):
+
+    """
+    Render documents a block at a time, caching the HTML of each block.
+
+    All changed blocks (and the page around them) are rendered in one call,
+    separated by HTML comment markers that are used to split the output again.
+    """
+
+    def __init__(self, max_blocks=4096):
+        """Initialize."""
+
+        self.lock = threading.Lock()
+        self.blocks = OrderedDict()
+        self.shells = OrderedDict()
+        self.max_blocks = max_blocks
+
+    def clear(self):
+        """Clear the caches."""
+
+        with self.lock:
+            self.blocks.clear()
+            self.shells.clear()
+
+    def render(self, text, prefix, render):
+        """
+        Render a document.
+
+        `prefix` identifies the render options (it is part of every cache key).
+        `render` is called with Markdown text and returns the return code and HTML.
+        Returns the return code and HTML, or `None` if the document must be rendered in full.
+        """
+
+        doc = split_blocks(text)
+        if doc is None:
+            return None
+
+        keys = []
+        sources = {}
+        for block in doc.blocks:
+            used = used_definitions(block, doc.definitions)
+            key = block_key(prefix, block, used)
+            keys.append(key)
+            sources[key] = (block, used)
+        shell_key = block_key(prefix, doc.frontmatter, [])
+
+        with self.lock:
+            cached = dict((k, self.blocks[k]) for k in keys if k in self.blocks)
+            shell = self.shells.get(shell_key)
+        dirty = [k for k in OrderedDict.fromkeys(keys) if k not in cached]
+
+        if dirty or shell is None:
+            parts = [doc.frontmatter, MARKER % 0, '']
+            used = OrderedDict()
+            for index, key in enumerate(dirty, 1):
+                block, definitions = sources[key]
+                parts.append(block)
+                parts.append(MARKER % index)
+                parts.append('')
+                for line in definitions:
+                    used[line] = None
+            parts.extend(used)
+            returncode, html = render('\n'.join(parts) + '\n')
+            if returncode:
+                return returncode, html
+
+            pieces = RE_MARKER.split(html)
+            # pieces: head, '0', html of block 1, '1', ..., html of block n, 'n', tail
+            if len(pieces) != 2 * len(dirty) + 3 or pieces[1::2] != [str(i) for i in range(len(dirty) + 1)]:
+                return None
+            shell = (pieces[0], pieces[-1])
+            for index, key in enumerate(dirty):
+                cached[key] = pieces[2 * index + 2]
+
+        with self.lock:
+            self.shells[shell_key] = shell
+            self.shells.move_to_end(shell_key)
+            while len(self.shells) > 16:
+                self.shells.popitem(last=False)
+            for key in keys:
+                self.blocks[key] = cached[key]
+                self.blocks.move_to_end(key)
+            while len(self.blocks) > self.max_blocks:
+                self.blocks.popitem(last=False)
+
+        return 0, shell[0] + ''.join(cached[k] for k in keys) + shell[1]
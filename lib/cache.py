@@ -0,0 +1,149 @@
+"""
+PyMdown render cache.
+
+Licensed under MIT
+Copyright (c) 2014 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import threading
+
+
+def make_key(cmd, data):
+    """Make a cache key from the command line and input bytes."""
+
+    h = hashlib.sha1(json.dumps(cmd).encode('utf-8'))
+    h.update(b'\0')
+    h.update(data)
+    return h.hexdigest()
+
+
+class RenderCache(object):
+
+    """
+    Size bounded LRU cache of rendered output.
+
+    Renders are kept in memory, and optionally in a folder on disk
+    so they survive restarts.  Both are bounded by size and evict the
+    least recently used renders first.
+    """
+
+    def __init__(self, max_size=8 * 1024 * 1024, folder=None, max_disk_size=64 * 1024 * 1024):
+        """Initialize."""
+
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.size = 0
+        self.max_size = max_size
+        self.folder = folder
+        self.max_disk_size = max_disk_size
+
+    def configure(self, max_size, folder=None, max_disk_size=None):
+        """Change the size limits and disk folder."""
+
+        with self.lock:
+            self.max_size = max_size
+            self.folder = folder
+            if max_disk_size is not None:
+                self.max_disk_size = max_disk_size
+            self._evict()
+
+    def get(self, key):
+        """Get a render, or `None` if it isn't cached."""
+
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+                return value
+            folder = self.folder
+
+        if folder is None:
+            return None
+        path = os.path.join(folder, key + '.html')
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = f.read()
+            # Mark as recently used
+            os.utime(path, None)
+        except (OSError, ValueError):
+            return None
+        with self.lock:
+            self._store(key, value)
+        return value
+
+    def set(self, key, value):
+        """Cache a render."""
+
+        with self.lock:
+            self._store(key, value)
+            folder = self.folder
+        if folder is not None:
+            try:
+                if not os.path.exists(folder):
+                    os.makedirs(folder)
+                with open(os.path.join(folder, key + '.html'), 'w', encoding='utf-8') as f:
+                    f.write(value)
+                self._evict_disk(folder)
+            except OSError:
+                pass
+
+    def clear(self):
+        """Clear the memory and disk caches."""
+
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+            folder = self.folder
+        if folder is not None and os.path.exists(folder):
+            for name in os.listdir(folder):
+                if name.endswith('.html'):
+                    try:
+                        os.remove(os.path.join(folder, name))
+                    except OSError:
+                        pass
+
+    def _store(self, key, value):
+        """Store a render in memory (lock must be held)."""
+
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+        if len(value) <= self.max_size:
+            self.entries[key] = value
+            self.size += len(value)
+        self._evict()
+
+    def _evict(self):
+        """Evict least recently used renders from memory (lock must be held)."""
+
+        while self.size > self.max_size and self.entries:
+            _, value = self.entries.popitem(last=False)
+            self.size -= len(value)
+
+    def _evict_disk(self, folder):
+        """Evict least recently used renders from disk."""
+
+        files = []
+        total = 0
+        for name in os.listdir(folder):
+            if not name.endswith('.html'):
+                continue
+            path = os.path.join(folder, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        files.sort()
+        for _, size, path in files:
+            if total <= self.max_disk_size:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
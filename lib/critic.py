@@ -0,0 +1,50 @@
+"""
+PyMdown CriticMarkup processing.
+
+Accepts or rejects CriticMarkup in a single pass over the text,
+giving the same result as `pymdown --critic-dump`.
+
+Licensed under MIT
+Copyright (c) 2014 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import re
+
+RE_CRITIC = re.compile(
+    r'''
+    \{
+    (?:
+        \+{2}(?P<ins>.*?)\+{2}
+      | \-{2}(?P<del>.*?)\-{2}
+      | \={2}(?P<mark>.*?)\={2}
+      | \>{2}(?P<comment>.*?)\<{2}
+      | \~{2}(?P<old>.*?)\~\>(?P<new>.*?)\~{2}
+    )
+    \}
+    ''',
+    re.DOTALL | re.VERBOSE
+)
+
+MODES = ('accept', 'reject')
+
+
+def critic_replace(m, accept):
+    """Get the replacement text of a mark."""
+
+    if m.group('ins') is not None:
+        return m.group('ins') if accept else ''
+    elif m.group('del') is not None:
+        return '' if accept else m.group('del')
+    elif m.group('mark') is not None:
+        return m.group('mark')
+    elif m.group('comment') is not None:
+        return ''
+    return m.group('new') if accept else m.group('old')
+
+
+def critic_dump(text, mode):
+    """Accept or reject all of the CriticMarkup in the text."""
+
+    if mode not in MODES:
+        raise ValueError("Invalid critic mode '%s'" % mode)
+    accept = mode == 'accept'
+    return RE_CRITIC.sub(lambda m: critic_replace(m, accept), text)
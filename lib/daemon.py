@@ -0,0 +1,236 @@
+"""
+PyMdown conversion daemon client.
+
+Licensed under MIT
+Copyright (c) 2014 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import json
+import subprocess
+import threading
+import time
+from .process import ConversionTimeout, kill_process_tree
+
+
+class DaemonError(Exception):
+
+    """Daemon communication error."""
+
+
+class PyMdownDaemon(object):
+
+    """
+    Client for a long lived PyMdown conversion server.
+
+    Requests are serialized, and the server is (re)started as needed
+    if it has not been started yet or has died.
+    """
+
+    def __init__(self, cmd, env=None, **popen_kwargs):
+        """Initialize."""
+
+        self.cmd = list(cmd)
+        self.env = env
+        self.popen_kwargs = popen_kwargs
+        self.process = None
+        self.timed_out = False
+        self.stopped = False
+        self.lock = threading.Lock()
+
+    def is_alive(self):
+        """Check if the server process is running."""
+
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        """Start the server process."""
+
+        self.process = subprocess.Popen(
+            self.cmd,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            env=self.env, **self.popen_kwargs
+        )
+
+    def stop(self):
+        """
+        Stop the server process for good.
+
+        This never waits for a request in progress: its server is killed instead,
+        and the request fails with `DaemonError`.
+        """
+
+        self.stopped = True
+        if self.lock.acquire(False):
+            try:
+                self._stop()
+            finally:
+                self.lock.release()
+        else:
+            p = self.process
+            if p is not None:
+                kill_process_tree(p.pid)
+
+    def _stop(self):
+        """Stop the server process (lock must be held)."""
+
+        if self.process is not None:
+            try:
+                self.process.stdin.close()
+                self.process.wait(timeout=2)
+            except Exception:
+                self.process.kill()
+                self.process.wait()
+            self.process = None
+
+    def _read_exact(self, size):
+        """Read exactly `size` bytes from the server."""
+
+        chunks = []
+        while size > 0:
+            chunk = self.process.stdout.read(size)
+            if not chunk:
+                raise DaemonError("PyMdown daemon closed the connection!")
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+    def _request(self, args, data):
+        """Send a request and read the response (lock must be held)."""
+
+        if self.stopped:
+            raise DaemonError("PyMdown daemon was stopped!")
+        if not self.is_alive():
+            self.start()
+            if self.stopped:
+                # Stopped while starting; `stop` may have missed the new process.
+                kill_process_tree(self.process.pid)
+        header = {"args": args, "input": len(data)}
+        self.process.stdin.write(json.dumps(header).encode('utf-8') + b'\n')
+        self.process.stdin.write(data)
+        self.process.stdin.flush()
+        line = self.process.stdout.readline()
+        if not line:
+            raise DaemonError("PyMdown daemon closed the connection!")
+        response = json.loads(line.decode('utf-8'))
+        results = self._read_exact(response['stdout'])
+        errors = self._read_exact(response['stderr'])
+        return response['returncode'], results, errors
+
+    def _timeout(self):
+        """Kill the server when a request takes too long."""
+
+        self.timed_out = True
+        p = self.process
+        if p is not None:
+            kill_process_tree(p.pid)
+
+    def request(self, args, data=b'', timeout=None):
+        """
+        Run a conversion with the given command line arguments and stdin data.
+
+        Returns the return code, stdout bytes, and stderr bytes.
+        If the server has crashed, it is restarted and the request is tried once more.
+        If the request takes longer than `timeout` seconds (including any wait for
+        another request to finish), the server is killed (it is restarted by the
+        next request) and `ConversionTimeout` is raised.
+        """
+
+        start = time.time()
+        if not self.lock.acquire(timeout=timeout if timeout is not None else -1):
+            raise ConversionTimeout("Conversion timed out after %.1f seconds!" % timeout)
+        try:
+            self.timed_out = False
+            timer = None
+            if timeout is not None:
+                timer = threading.Timer(max(0.0, timeout - (time.time() - start)), self._timeout)
+                timer.daemon = True
+                timer.start()
+            try:
+                try:
+                    return self._request(args, data)
+                except (OSError, ValueError, DaemonError):
+                    self._stop()
+                    if self.timed_out:
+                        raise ConversionTimeout("Conversion timed out after %.1f seconds!" % timeout)
+                return self._request(args, data)
+            except (OSError, ValueError, DaemonError):
+                if self.timed_out:
+                    self._stop()
+                    raise ConversionTimeout("Conversion timed out after %.1f seconds!" % timeout)
+                raise
+            finally:
+                if timer is not None:
+                    timer.cancel()
+        finally:
+            self.lock.release()
+
+
+class PyMdownDaemonPool(object):
+
+    """
+    A pool of conversion servers, so conversions don't wait on each other.
+
+    Servers are started as they are needed, up to `size` of them.
+    A request waits for an idle server (within its timeout) if they are all busy.
+    """
+
+    def __init__(self, cmd, size=1, env=None, **popen_kwargs):
+        """Initialize."""
+
+        self.cmd = list(cmd)
+        self.size = max(1, size)
+        self.env = env
+        self.popen_kwargs = popen_kwargs
+        self.condition = threading.Condition()
+        self.idle = []
+        self.daemons = []
+        self.stopped = False
+
+    def acquire(self, timeout=None):
+        """Get an idle server, starting a new one if there is room."""
+
+        deadline = time.time() + timeout if timeout is not None else None
+        with self.condition:
+            while not self.stopped and not self.idle and len(self.daemons) >= self.size:
+                remaining = deadline - time.time() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    raise ConversionTimeout("Conversion timed out after %.1f seconds!" % timeout)
+                self.condition.wait(remaining)
+            if self.stopped:
+                raise DaemonError("PyMdown daemon was stopped!")
+            if self.idle:
+                return self.idle.pop()
+            daemon = PyMdownDaemon(self.cmd, self.env, **self.popen_kwargs)
+            self.daemons.append(daemon)
+            return daemon
+
+    def release(self, daemon):
+        """Give a server back to the pool."""
+
+        with self.condition:
+            if daemon in self.daemons:
+                self.idle.append(daemon)
+            self.condition.notify()
+
+    def request(self, args, data=b'', timeout=None):
+        """Run a conversion on an idle server (see `PyMdownDaemon.request`)."""
+
+        start = time.time()
+        daemon = self.acquire(timeout)
+        try:
+            if timeout is not None:
+                timeout = max(0.0, timeout - (time.time() - start))
+            return daemon.request(args, data, timeout)
+        finally:
+            self.release(daemon)
+
+    def stop(self):
+        """Stop all servers."""
+
+        with self.condition:
+            self.stopped = True
+            daemons = self.daemons
+            self.daemons = []
+            self.idle = []
+            self.condition.notify_all()
+        for daemon in daemons:
+            daemon.stop()
@@ -0,0 +1,178 @@
+"""
+PyMdown batch file discovery.
+
+Licensed under MIT
+Copyright (c) 2014 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import fnmatch
+import os
+import re
+import threading
+import time
+
+# Folders modified more recently than this (in seconds) are not indexed,
+# as a change within the file system's timestamp resolution would go unnoticed.
+RACY_WINDOW = 2
+
+try:
+    from os import scandir
+except ImportError:
+    scandir = None
+
+
+def normpattern(path):
+    """Normalize a path or pattern to the case of the OS and `/` separators."""
+
+    return os.path.normcase(path).replace(os.sep, '/')
+
+
+def compile_patterns(patterns):
+    """
+    Compile shell style patterns into a single matching function.
+
+    The function is called with a name and its path relative to the folder
+    being searched.  Patterns with a `/` in them (like `docs/*.md`) are matched
+    against the relative path, the others against the name.
+    Patterns are only case insensitive on OSs that are.
+    """
+
+    names = []
+    paths = []
+    for p in patterns:
+        p = normpattern(p)
+        (paths if '/' in p else names).append(re.compile(fnmatch.translate(p)))
+
+    def match(name, relative=None):
+        name = os.path.normcase(name)
+        for pattern in names:
+            if pattern.match(name):
+                return True
+        if paths:
+            relative = name if relative is None else normpattern(relative)
+            for pattern in paths:
+                if pattern.match(relative):
+                    return True
+        return False
+
+    return match
+
+
+class FileDiscovery(object):
+
+    """
+    Find files matching patterns in folder trees.
+
+    Folder listings are indexed by the folder's modification time,
+    so scanning a tree again only lists folders whose entries have changed.
+    """
+
+    def __init__(self):
+        """Initialize."""
+
+        self.lock = threading.Lock()
+        self.index = {}
+
+    def list_folder(self, folder):
+        """Get the files and sub folders of a folder, and the names that are symlinks."""
+
+        mtime = os.stat(folder).st_mtime_ns
+        with self.lock:
+            cached = self.index.get(folder)
+        if cached is not None and cached[0] == mtime:
+            return cached[1:]
+
+        files = []
+        folders = []
+        links = set()
+        if scandir is not None:
+            for entry in scandir(folder):
+                try:
+                    is_dir = entry.is_dir()
+                    if entry.is_symlink():
+                        links.add(entry.name)
+                except OSError:
+                    continue
+                (folders if is_dir else files).append(entry.name)
+        else:
+            for name in os.listdir(folder):
+                path = os.path.join(folder, name)
+                if os.path.islink(path):
+                    links.add(name)
+                (folders if os.path.isdir(path) else files).append(name)
+        files.sort()
+        folders.sort()
+
+        if time.time() - mtime / 1e9 > RACY_WINDOW:
+            with self.lock:
+                self.index[folder] = (mtime, files, folders, links)
+        return files, folders, links
+
+    def clear(self):
+        """Clear the folder index."""
+
+        with self.lock:
+            self.index.clear()
+
+    def find(self, paths, patterns, ignore=(), recursive=True):
+        """
+        Expand paths into a list of files to convert.
+
+        Files are used as is, and folders are scanned (recursively if enabled)
+        for files matching any of the patterns.  Files and folders matching
+        the ignore patterns are skipped.  Patterns with a path are matched
+        against the path relative to the selected folder.  If there are no patterns,
+        existing paths are passed through as is.  Each file is only returned once,
+        even if it is reachable through several paths or symlinks.
+
+        Only the selected paths and symlinks are resolved; the real path of anything
+        else is its real parent folder joined with its name.
+        """
+
+        match = compile_patterns(patterns)
+        ignored = compile_patterns(ignore)
+        seen = set()
+        seen_folders = set()
+        results = []
+
+        def resolve(path):
+            return os.path.normcase(os.path.realpath(path))
+
+        def add(path, real):
+            if real not in seen:
+                seen.add(real)
+                results.append(path)
+
+        for pth in paths:
+            if os.path.isfile(pth):
+                add(pth, resolve(pth))
+            elif not os.path.isdir(pth):
+                continue
+            elif not patterns:
+                add(pth, resolve(pth))
+            else:
+                stack = [(pth, resolve(pth), '')]
+                while stack:
+                    folder, real, relative = stack.pop()
+                    if real in seen_folders:
+                        continue
+                    seen_folders.add(real)
+                    try:
+                        files, folders, links = self.list_folder(folder)
+                    except OSError:
+                        continue
+                    for name in files:
+                        rel = relative + name
+                        if match(name, rel) and not ignored(name, rel):
+                            path = os.path.join(folder, name)
+                            add(path, resolve(path) if name in links else os.path.join(real, os.path.normcase(name)))
+                    if recursive:
+                        for name in reversed(folders):
+                            rel = relative + name
+                            if not ignored(name, rel):
+                                path = os.path.join(folder, name)
+                                stack.append((
+                                    path,
+                                    resolve(path) if name in links else os.path.join(real, os.path.normcase(name)),
+                                    rel + '/'
+                                ))
+        return results
@@ -0,0 +1,179 @@
+"""
+PyMdown incremental build manifest.
+
+Licensed under MIT
+Copyright (c) 2014 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import hashlib
+import json
+import os
+import threading
+
+MANIFEST_VERSION = 1
+
+_lock = threading.Lock()
+
+
+def file_hash(path):
+    """Get the SHA1 of a file's content."""
+
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def file_stat(path):
+    """Get a file's mtime and size, or `None` if it doesn't exist."""
+
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime, st.st_size]
+
+
+def folder_stat(folder):
+    """Get the relative path, mtime, and size of every file in a folder tree, or `None` if it doesn't exist."""
+
+    if not os.path.isdir(folder):
+        return None
+    stats = []
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            stat = file_stat(path)
+            if stat is not None:
+                stats.append([os.path.relpath(path, folder).replace(os.sep, '/')] + stat)
+    return stats
+
+
+def output_path(path):
+    """Get where PyMdown writes the HTML for a source file by default."""
+
+    return os.path.splitext(path)[0] + '.html'
+
+
+def output_updated(path, since):
+    """Check if the HTML of a source file was written at or after the given time."""
+
+    try:
+        # Some file systems only keep whole seconds.
+        return os.stat(output_path(path)).st_mtime >= int(since)
+    except OSError:
+        return False
+
+
+def config_stat(config):
+    """
+    Add the state of PyMdown's configuration to the build config.
+
+    This is the mtime and size of the alternate settings file (if any),
+    and of every file in PyMdown's own folder (`config_folder`), which holds
+    its default settings file and usually the templates and stylesheets.
+    """
+
+    config = dict(config)
+    settings = config.get('settings')
+    if settings:
+        config['settings_stat'] = file_stat(settings)
+    folder = config.get('config_folder')
+    if folder:
+        config['config_folder_stat'] = folder_stat(folder)
+    return config
+
+
+class BuildManifest(object):
+
+    """
+    Record of the files converted by previous batch runs.
+
+    Each converted source records its mtime, size, and content hash,
+    and the mtime of its HTML output if it exists.  The manifest also records the
+    build config (command line, settings file, critic mode); if it changes,
+    every file is considered dirty.
+    """
+
+    def __init__(self, path, config):
+        """Initialize."""
+
+        self.path = path
+        self.config = config_stat(config)
+        self.files = {}
+        self.forgotten = set()
+        self.load()
+
+    def load(self):
+        """Load the manifest from disk."""
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') == MANIFEST_VERSION and data.get('config') == self.config:
+            self.files = data.get('files', {})
+
+    def save(self):
+        """
+        Save the manifest to disk.
+
+        Entries written by other builds since this manifest was loaded are merged in.
+        """
+
+        with _lock:
+            current = BuildManifest.__new__(BuildManifest)
+            current.path = self.path
+            current.config = self.config
+            current.files = {}
+            current.load()
+            current.files.update(self.files)
+            for path in self.forgotten:
+                current.files.pop(path, None)
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({"version": MANIFEST_VERSION, "config": self.config, "files": current.files}, f)
+            os.replace(tmp, self.path)
+
+    def is_dirty(self, path):
+        """Check if a file needs to be converted."""
+
+        path = os.path.abspath(path)
+        entry = self.files.get(path)
+        if entry is None:
+            return True
+        stat = file_stat(path)
+        if stat is None:
+            return True
+        if entry['output'] is not None and file_stat(output_path(path)) != entry['output']:
+            return True
+        if stat == entry['stat']:
+            return False
+        if stat[1] != entry['stat'][1] or file_hash(path) != entry['hash']:
+            return True
+        # Touched but not changed
+        entry['stat'] = stat
+        return False
+
+    def record(self, path):
+        """Record a successfully converted file."""
+
+        path = os.path.abspath(path)
+        self.forgotten.discard(path)
+        self.files[path] = {
+            "stat": file_stat(path),
+            "hash": file_hash(path),
+            "output": file_stat(output_path(path))
+        }
+
+    def forget(self, path):
+        """Forget a file so it is converted next time."""
+
+        path = os.path.abspath(path)
+        self.forgotten.add(path)
+        self.files.pop(path, None)
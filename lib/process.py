@@ -0,0 +1,44 @@
+"""
+PyMdown process helpers.
+
+Licensed under MIT
+Copyright (c) 2014 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import os
+import signal
+import subprocess
+import sys
+
+WINDOWS = sys.platform.startswith('win')
+
+
+class ConversionTimeout(Exception):
+
+    """A conversion ran longer than allowed and was killed."""
+
+
+def new_group_kwargs():
+    """
+    Get `Popen` keyword arguments that start a process in its own process group.
+
+    This allows killing the process along with any children it starts.
+    """
+
+    return {} if WINDOWS else {"start_new_session": True}
+
+
+def kill_process_tree(pid):
+    """Kill a process and all of its children."""
+
+    try:
+        if WINDOWS:
+            startupinfo = subprocess.STARTUPINFO()
+            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+            subprocess.call(
+                ['taskkill', '/F', '/T', '/PID', str(pid)],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, startupinfo=startupinfo
+            )
+        else:
+            os.killpg(pid, signal.SIGKILL)
+    except OSError:
+        pass
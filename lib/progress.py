@@ -0,0 +1,138 @@
+"""
+PyMdown batch progress.
+
+Licensed under MIT
+Copyright (c) 2014 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import json
+import os
+import threading
+import time
+
+
+def format_seconds(seconds):
+    """Format a duration for display."""
+
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return '%ds' % seconds
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return '%dm %02ds' % (minutes, seconds)
+    hours, minutes = divmod(minutes, 60)
+    return '%dh %02dm' % (hours, minutes)
+
+
+class BatchProgress(object):
+
+    """
+    Track the progress of a batch conversion.
+
+    Chunks of files are reported as they finish (from any thread).
+    The files of a chunk are converted by a single process, so durations are
+    only known per chunk, and are reported that way.
+    """
+
+    def __init__(self, total, skipped=0, interval=0.5, clock=time.time):
+        """Initialize."""
+
+        self.lock = threading.Lock()
+        self.total = total
+        self.skipped = skipped
+        self.interval = interval
+        self.clock = clock
+        self.start = clock()
+        self.end = None
+        self.last_report = None
+        self.done = 0
+        self.failed = 0
+        self.chunks = []
+
+    def update(self, result):
+        """
+        Record a finished chunk.
+
+        Returns true if enough time has passed that progress should be reported again.
+        """
+
+        with self.lock:
+            self.chunks.append(
+                {
+                    "files": list(result.paths),
+                    "duration": result.duration,
+                    "returncode": result.returncode,
+                    "failed": list(result.failed)
+                }
+            )
+            self.done += len(result.paths)
+            self.failed += len(result.failed)
+            now = self.clock()
+            report = self.last_report is None or now - self.last_report >= self.interval or self.done >= self.total
+            if report:
+                self.last_report = now
+        return report
+
+    def finish(self):
+        """Mark the batch as finished."""
+
+        with self.lock:
+            self.end = self.clock()
+
+    def elapsed(self):
+        """Get the seconds since the batch started."""
+
+        return (self.end if self.end is not None else self.clock()) - self.start
+
+    def rate(self):
+        """Get the files converted per second."""
+
+        elapsed = self.elapsed()
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def eta(self):
+        """Get the estimated seconds left, or `None` if there is nothing to go by yet."""
+
+        rate = self.rate()
+        if not self.done or not rate:
+            return None
+        return (self.total - self.done) / rate
+
+    def status(self):
+        """Get a one line summary of the progress."""
+
+        with self.lock:
+            parts = ['%d/%d files' % (self.done, self.total), '%.1f files/s' % self.rate()]
+            if self.end is not None:
+                parts.append('took %s' % format_seconds(self.elapsed()))
+            else:
+                eta = self.eta()
+                parts.append('ETA %s' % (format_seconds(eta) if eta is not None else '?'))
+            if self.failed:
+                parts.append('%d failed' % self.failed)
+        return ', '.join(parts)
+
+    def report(self):
+        """Get a JSON report of the batch, with the slowest chunks first."""
+
+        with self.lock:
+            report = {
+                "total": self.total,
+                "converted": self.done - self.failed,
+                "failed": self.failed,
+                "skipped": self.skipped,
+                "duration": self.elapsed(),
+                "files_per_second": self.rate(),
+                "chunks": sorted(self.chunks, key=lambda c: c["duration"], reverse=True)
+            }
+        return json.dumps(report, indent=4)
+
+    def save(self, path):
+        """Write the JSON report to a file."""
+
+        folder = os.path.dirname(path)
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        temp = path + '.tmp'
+        with open(temp, 'w', encoding='utf-8') as f:
+            f.write(self.report())
+        os.replace(temp, path)
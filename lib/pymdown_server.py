@@ -0,0 +1,97 @@
+"""
+PyMdown conversion server.
+
+Keeps a Python interpreter with PyMdown already imported alive,
+and runs conversion requests sent over stdin, writing the results to stdout.
+This script is run with the Python interpreter PyMdown is installed in, not Sublime's.
+
+Requests are a line of JSON (``{"args": [...], "input": <byte length>}``)
+followed by the input bytes.  Responses are a line of JSON
+(``{"returncode": <int>, "stdout": <byte length>, "stderr": <byte length>}``)
+followed by the stdout bytes and then the stderr bytes.
+
+Licensed under MIT
+Copyright (c) 2014 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import importlib
+import io
+import json
+import sys
+import traceback
+
+
+def load_entry(entry):
+    """Load the conversion entry point from a `module:function` string."""
+
+    module, func = entry.split(':', 1)
+    return getattr(importlib.import_module(module), func)
+
+
+def read_exact(stream, size):
+    """Read exactly `size` bytes from the stream."""
+
+    chunks = []
+    while size > 0:
+        chunk = stream.read(size)
+        if not chunk:
+            raise EOFError("Unexpected end of request")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def run_request(main, args, data):
+    """Run a single conversion with redirected standard streams."""
+
+    out = io.BytesIO()
+    err = io.BytesIO()
+    saved = (sys.argv, sys.stdin, sys.stdout, sys.stderr)
+    sys.argv = ['pymdown'] + args
+    sys.stdin = io.TextIOWrapper(io.BytesIO(data), encoding='utf-8')
+    sys.stdout = io.TextIOWrapper(out, encoding='utf-8', write_through=True)
+    sys.stderr = io.TextIOWrapper(err, encoding='utf-8', write_through=True)
+    try:
+        returncode = main()
+    except SystemExit as e:
+        returncode = e.code
+    except Exception:
+        sys.stderr.write(traceback.format_exc())
+        returncode = 1
+    finally:
+        # Detach the wrappers so they don't close the buffers when collected.
+        for stream in (sys.stdin, sys.stdout, sys.stderr):
+            stream.flush()
+            stream.detach()
+        sys.argv, sys.stdin, sys.stdout, sys.stderr = saved
+
+    if returncode is None:
+        returncode = 0
+    elif not isinstance(returncode, int):
+        err.write(('%s\n' % returncode).encode('utf-8'))
+        returncode = 1
+    return returncode, out.getvalue(), err.getvalue()
+
+
+def serve(entry):
+    """Serve conversion requests until stdin is closed."""
+
+    stdin = sys.stdin.buffer
+    stdout = sys.stdout.buffer
+    main = load_entry(entry)
+
+    while True:
+        header = stdin.readline()
+        if not header:
+            break
+        request = json.loads(header.decode('utf-8'))
+        data = read_exact(stdin, request.get('input', 0))
+        returncode, results, errors = run_request(main, request.get('args', []), data)
+        response = {"returncode": returncode, "stdout": len(results), "stderr": len(errors)}
+        stdout.write(json.dumps(response).encode('utf-8') + b'\n')
+        stdout.write(results)
+        stdout.write(errors)
+        stdout.flush()
+
+
+if __name__ == "__main__":
+    serve(sys.argv[1] if len(sys.argv) > 1 else 'pymdown.__main__:main')
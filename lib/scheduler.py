@@ -0,0 +1,165 @@
+"""
+PyMdown job scheduler.
+
+Licensed under MIT
+Copyright (c) 2014 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+from collections import OrderedDict
+import threading
+import traceback
+
+
+class Job(object):
+
+    """A unit of work for the scheduler."""
+
+    def __init__(self, key, func, cancel=None, log=print):
+        """Initialize."""
+
+        self.key = key
+        self.func = func
+        self.cancel_func = cancel
+        self.log = log
+        self.cancelled = False
+
+    def cancel(self):
+        """Cancel the job."""
+
+        self.cancelled = True
+        if self.cancel_func is not None:
+            try:
+                self.cancel_func()
+            except Exception:
+                self.log(traceback.format_exc())
+
+    def run(self):
+        """Run the job if it hasn't been cancelled and return what it returned."""
+
+        if not self.cancelled:
+            try:
+                return self.func()
+            except Exception:
+                self.log(traceback.format_exc())
+        return None
+
+
+class JobScheduler(object):
+
+    """
+    Run jobs on a bounded pool of worker threads.
+
+    Jobs can be given a key.  Submitting a job with the key of a job
+    that is still queued replaces the queued job, and submitting a job with the
+    key of a job that is running cancels the running job.
+
+    A job can return a future to finish in the background: its thread is freed
+    right away, but the job counts as running until the future is done.
+    """
+
+    def __init__(self, workers=2, log=print):
+        """Initialize with the number of worker threads and a function that reports job errors."""
+
+        self.condition = threading.Condition()
+        self.pending = OrderedDict()
+        self.running = {}
+        self.threads = []
+        self.workers = max(1, workers)
+        self.log = log
+        self.closed = False
+        self.count = 0
+
+    def resize(self, workers):
+        """Change the number of worker threads."""
+
+        with self.condition:
+            self.workers = max(1, workers)
+            self.condition.notify_all()
+            self._spawn()
+
+    def _spawn(self):
+        """Start worker threads if there is queued work (lock must be held)."""
+
+        while len(self.threads) < min(self.workers, len(self.pending) + len(self.running)):
+            t = threading.Thread(target=self._work)
+            t.daemon = True
+            self.threads.append(t)
+            t.start()
+
+    def submit(self, func, key=None, cancel=None):
+        """Queue a job."""
+
+        with self.condition:
+            if self.closed:
+                raise RuntimeError("Scheduler has been shut down!")
+            if key is None:
+                self.count += 1
+                key = ('job', self.count)
+            old = self.pending.pop(key, None)
+            if old is not None:
+                old.cancelled = True
+            if key in self.running:
+                self.running[key].cancel()
+            job = Job(key, func, cancel, self.log)
+            self.pending[key] = job
+            self._spawn()
+            self.condition.notify()
+        return job
+
+    def cancel(self, key):
+        """Cancel queued and running jobs with the given key."""
+
+        with self.condition:
+            job = self.pending.pop(key, None)
+            if job is not None:
+                job.cancelled = True
+            job = self.running.get(key)
+        if job is not None:
+            job.cancel()
+
+    def cancel_all(self):
+        """Cancel all queued and running jobs."""
+
+        with self.condition:
+            for job in self.pending.values():
+                job.cancelled = True
+            self.pending.clear()
+            running = list(self.running.values())
+        for job in running:
+            job.cancel()
+        return len(running)
+
+    def shutdown(self):
+        """Cancel all jobs and stop the worker threads."""
+
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.cancel_all()
+
+    def _work(self):
+        """Worker thread loop."""
+
+        current = threading.current_thread()
+        while True:
+            with self.condition:
+                while not self.pending and not self.closed and len(self.threads) <= self.workers:
+                    self.condition.wait()
+                if self.closed or len(self.threads) > self.workers:
+                    self.threads.remove(current)
+                    return
+                key, job = self.pending.popitem(last=False)
+                self.running[key] = job
+
+            pending = job.run()
+
+            if hasattr(pending, 'add_done_callback'):
+                pending.add_done_callback(lambda future, key=key, job=job: self._finish(key, job))
+            else:
+                self._finish(key, job)
+
+    def _finish(self, key, job):
+        """Forget about a job that is done."""
+
+        with self.condition:
+            if self.running.get(key) is job:
+                del self.running[key]
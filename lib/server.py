@@ -0,0 +1,219 @@
+"""
+PyMdown preview server.
+
+Serves the latest render of each view from memory on a loopback port,
+and tells open pages to reload through server-sent events when a new render arrives.
+
+Licensed under MIT
+Copyright (c) 2014 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import binascii
+import os
+import socketserver
+import threading
+
+# Seconds between keep alive comments on idle event streams.
+KEEP_ALIVE = 15.0
+
+RELOAD_SCRIPT = '''<script>
+(function () {
+    var key = 'pymdown-server-%(view)d';
+    var y = window.sessionStorage ? sessionStorage.getItem(key) : null;
+    if (y !== null) {
+        window.addEventListener('load', function () { window.scrollTo(0, parseInt(y, 10)); });
+    }
+    var source = new EventSource('%(events)s');
+    source.onmessage = function (e) {
+        if (e.data !== '%(version)d') {
+            source.close();
+            if (window.sessionStorage) { sessionStorage.setItem(key, window.pageYOffset); }
+            window.location.reload();
+        }
+    };
+    source.addEventListener('close', function () { source.close(); });
+})();
+</script>
+'''
+
+
+class ThreadedHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+
+    """HTTP server handling each request in its own thread."""
+
+    daemon_threads = True
+
+
+class PreviewHandler(BaseHTTPRequestHandler):
+
+    """Serve pages and their event streams."""
+
+    def log_message(self, format, *args):
+        """Don't log requests."""
+
+    def do_GET(self):
+        """Handle a request."""
+
+        preview = self.server.preview
+        # Only answer requests addressed to the loopback host (guards against DNS rebinding)
+        # that know the server's token.
+        if self.headers.get('Host', '') not in preview.hosts:
+            self.send_error(403)
+            return
+        parts = self.path.split('?', 1)[0].strip('/').split('/')
+        if len(parts) != 3 or parts[0] != preview.token or not parts[2].isdigit():
+            self.send_error(404)
+            return
+        view_id = int(parts[2])
+        if parts[1] == 'view':
+            self.send_page(preview, view_id)
+        elif parts[1] == 'events':
+            self.send_events(preview, view_id)
+        else:
+            self.send_error(404)
+
+    def send_page(self, preview, view_id):
+        """Send the latest render of a view."""
+
+        page = preview.get(view_id)
+        if page is None:
+            self.send_error(404)
+            return
+        version, html = page
+        script = RELOAD_SCRIPT % {"view": view_id, "version": version, "events": preview.path('events', view_id)}
+        index = html.rfind('</body>')
+        html = html + script if index == -1 else html[:index] + script + html[index:]
+        data = html.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_events(self, preview, view_id):
+        """Stream the version of a view's render whenever it changes."""
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        version = None
+        try:
+            with preview.listening(view_id):
+                while True:
+                    current = preview.wait(view_id, version, KEEP_ALIVE)
+                    if current is None:
+                        self.wfile.write(b'event: close\ndata: \n\n')
+                        break
+                    if current == version:
+                        self.wfile.write(b': keep alive\n\n')
+                    else:
+                        version = current
+                        self.wfile.write(('data: %d\n\n' % version).encode('utf-8'))
+                    self.wfile.flush()
+        except (OSError, ValueError):
+            # The page was closed.
+            pass
+
+
+class PreviewServer(object):
+
+    """
+    Keep the latest render of each view in memory and serve it on a loopback port.
+
+    Pages are served at `/<token>/view/<view id>`, where the token is random,
+    so other local processes and web pages can't guess the URLs.
+    """
+
+    def __init__(self, port=0):
+        """Start the server."""
+
+        self.condition = threading.Condition()
+        self.pages = {}
+        self.listeners = {}
+        self.running = True
+        self.token = binascii.hexlify(os.urandom(16)).decode('ascii')
+        self.httpd = ThreadedHTTPServer(('127.0.0.1', port), PreviewHandler)
+        self.httpd.preview = self
+        self.port = self.httpd.server_address[1]
+        self.hosts = ('127.0.0.1:%d' % self.port, 'localhost:%d' % self.port)
+        self.thread = threading.Thread(target=self.httpd.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def path(self, kind, view_id):
+        """Get the path of a view's page or event stream."""
+
+        return '/%s/%s/%d' % (self.token, kind, view_id)
+
+    def url(self, view_id):
+        """Get the URL of a view's page."""
+
+        return 'http://127.0.0.1:%d%s' % (self.port, self.path('view', view_id))
+
+    def publish(self, view_id, html):
+        """Store a new render of a view and notify its open pages."""
+
+        with self.condition:
+            version = self.pages[view_id][0] + 1 if view_id in self.pages else 1
+            self.pages[view_id] = (version, html)
+            self.condition.notify_all()
+
+    def get(self, view_id):
+        """Get the version and HTML of a view's latest render, or `None`."""
+
+        with self.condition:
+            return self.pages.get(view_id)
+
+    def remove(self, view_id):
+        """Forget a view, closing the event streams of its pages."""
+
+        with self.condition:
+            self.pages.pop(view_id, None)
+            self.condition.notify_all()
+
+    def is_watched(self, view_id):
+        """Check if a page of the view is open (listening for updates)."""
+
+        with self.condition:
+            return self.listeners.get(view_id, 0) > 0
+
+    @contextmanager
+    def listening(self, view_id):
+        """Count an open page of a view for the duration of the context."""
+
+        with self.condition:
+            self.listeners[view_id] = self.listeners.get(view_id, 0) + 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.listeners[view_id] -= 1
+
+    def wait(self, view_id, version, timeout):
+        """
+        Wait up to `timeout` seconds for a render newer than `version`.
+
+        Returns the current version, or `None` if the view is gone or the server is stopping.
+        """
+
+        with self.condition:
+            self.condition.wait_for(
+                lambda: not self.running or view_id not in self.pages or self.pages[view_id][0] != version,
+                timeout
+            )
+            if not self.running or view_id not in self.pages:
+                return None
+            return self.pages[view_id][0]
+
+    def stop(self):
+        """Stop the server."""
+
+        with self.condition:
+            self.running = False
+            self.pages.clear()
+            self.condition.notify_all()
+        self.httpd.shutdown()
+        self.httpd.server_close()
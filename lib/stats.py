@@ -0,0 +1,96 @@
+"""
+PyMdown conversion statistics.
+
+Licensed under MIT
+Copyright (c) 2014 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+from collections import deque, OrderedDict
+import math
+import threading
+
+STAGES = ('environ', 'binary', 'spawn', 'cache', 'partial', 'spill', 'daemon', 'pipe', 'decode', 'callback', 'total')
+
+
+def percentile(values, pct):
+    """Get a percentile (nearest rank) of a list of values."""
+
+    values = sorted(values)
+    index = max(0, min(len(values) - 1, int(math.ceil(pct / 100.0 * len(values))) - 1))
+    return values[index]
+
+
+class ConversionStats(object):
+
+    """Rolling history of conversion timings per command type."""
+
+    def __init__(self, history=200):
+        """Initialize."""
+
+        self.lock = threading.Lock()
+        self.history = history
+        self.records = OrderedDict()
+        self.counters = {}
+
+    def record(self, command, timings, bytes_in=0, bytes_out=0, error=False):
+        """Record a conversion's stage timings (in seconds) and bytes sent and received."""
+
+        entry = {"timings": dict(timings), "bytes_in": bytes_in, "bytes_out": bytes_out, "error": bool(error)}
+        with self.lock:
+            if command not in self.records:
+                self.records[command] = deque(maxlen=self.history)
+            self.records[command].append(entry)
+
+    def count(self, counter, amount=1):
+        """Increment a named counter."""
+
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def clear(self):
+        """Clear the history."""
+
+        with self.lock:
+            self.records.clear()
+            self.counters.clear()
+
+    def summary(self):
+        """Summarize the history per command type."""
+
+        with self.lock:
+            records = [(k, list(v)) for k, v in self.records.items()]
+        summary = OrderedDict()
+        for command, entries in records:
+            stages = OrderedDict()
+            for stage in STAGES:
+                values = [e['timings'][stage] for e in entries if stage in e['timings']]
+                if values:
+                    stages[stage] = (len(values), percentile(values, 50), percentile(values, 95))
+            summary[command] = {
+                "count": len(entries),
+                "errors": sum(1 for e in entries if e['error']),
+                "bytes_in": sum(e['bytes_in'] for e in entries),
+                "bytes_out": sum(e['bytes_out'] for e in entries),
+                "stages": stages
+            }
+        return summary
+
+    def report(self):
+        """Format the summary as text."""
+
+        lines = []
+        for command, info in self.summary().items():
+            lines.append(
+                '%s: %d conversion(s), %d error(s), %d bytes in, %d bytes out' % (
+                    command, info['count'], info['errors'], info['bytes_in'], info['bytes_out']
+                )
+            )
+            for stage, (count, p50, p95) in info['stages'].items():
+                lines.append('    %-10s n=%-5d p50 %10.2f ms    p95 %10.2f ms' % (stage, count, p50 * 1000, p95 * 1000))
+            lines.append('')
+        with self.lock:
+            counters = sorted(self.counters.items())
+        for counter, value in counters:
+            lines.append('%s: %d' % (counter, value))
+        if not lines:
+            lines.append('No conversions recorded.')
+        return '\n'.join(lines) + '\n'
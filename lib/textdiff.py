@@ -0,0 +1,138 @@
+"""
+PyMdown text diffing.
+
+Finds the line level changes needed to turn one text into another,
+so a view can be edited in place instead of replaced wholesale.
+
+Lines that occur exactly once in both texts are used as anchors (as in patience diff),
+and only the small gaps between anchors are diffed line by line, so the cost grows
+with the size of the texts times a log factor, not with their product.
+
+Licensed under MIT
+Copyright (c) 2014 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+from bisect import bisect_left
+from collections import Counter
+from difflib import SequenceMatcher
+
+# Gaps between anchors with at most this many lines on each side are diffed line by line,
+# larger ones are replaced as a whole.
+MAX_GAP_LINES = 64
+
+# Texts whose changed middle has more lines than this are replaced as a whole.
+MAX_DIFF_LINES = 500000
+
+
+def split_lines(text):
+    """Split text into lines, keeping the line endings."""
+
+    lines = [line + '\n' for line in text.split('\n')]
+    lines[-1] = lines[-1][:-1]
+    if not lines[-1]:
+        lines.pop()
+    return lines
+
+
+def unique_anchors(a, b):
+    """
+    Get the pairs of indexes of lines that occur once in each list.
+
+    Only the longest run of pairs that is in order in both lists is kept.
+    """
+
+    count_a = Counter(a)
+    count_b = Counter(b)
+    index_b = dict((line, j) for j, line in enumerate(b) if count_b[line] == 1)
+    pairs = [(i, index_b[line]) for i, line in enumerate(a) if count_a[line] == 1 and line in index_b]
+
+    # Longest increasing subsequence of the `b` indexes.
+    tails = []
+    tail_pairs = []
+    previous = [None] * len(pairs)
+    for k, (i, j) in enumerate(pairs):
+        pos = bisect_left(tails, j)
+        previous[k] = tail_pairs[pos - 1] if pos else None
+        if pos == len(tails):
+            tails.append(j)
+            tail_pairs.append(k)
+        else:
+            tails[pos] = j
+            tail_pairs[pos] = k
+    anchors = []
+    k = tail_pairs[-1] if tail_pairs else None
+    while k is not None:
+        anchors.append(pairs[k])
+        k = previous[k]
+    anchors.reverse()
+    return anchors
+
+
+def diff_gap(a, a1, a2, b, b1, b2):
+    """Get the changed line ranges `(a1, a2, b1, b2)` between two anchors."""
+
+    while a1 < a2 and b1 < b2 and a[a1] == b[b1]:
+        a1 += 1
+        b1 += 1
+    while a1 < a2 and b1 < b2 and a[a2 - 1] == b[b2 - 1]:
+        a2 -= 1
+        b2 -= 1
+    if a1 == a2 and b1 == b2:
+        return []
+    if a2 - a1 > MAX_GAP_LINES or b2 - b1 > MAX_GAP_LINES or a1 == a2 or b1 == b2:
+        return [(a1, a2, b1, b2)]
+    matcher = SequenceMatcher(None, a[a1:a2], b[b1:b2], autojunk=False)
+    return [
+        (a1 + i1, a1 + i2, b1 + j1, b1 + j2)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != 'equal'
+    ]
+
+
+def line_hunks(old, new):
+    """
+    Get the changes that turn `old` into `new`.
+
+    Returns a list of `(start, end, text)` hunks in order, where `start` and `end`
+    are character offsets into `old` of the lines that are replaced by `text`.
+    Apply them in reverse so earlier offsets stay valid.
+    """
+
+    if old == new:
+        return []
+
+    a = split_lines(old)
+    b = split_lines(new)
+
+    prefix = 0
+    limit = min(len(a), len(b))
+    while prefix < limit and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    limit -= prefix
+    while suffix < limit and a[-1 - suffix] == b[-1 - suffix]:
+        suffix += 1
+    a_end = len(a) - suffix
+    b_end = len(b) - suffix
+
+    if (a_end - prefix) + (b_end - prefix) > MAX_DIFF_LINES:
+        changes = [(prefix, a_end, prefix, b_end)]
+    else:
+        changes = []
+        a1 = b1 = prefix
+        anchors = unique_anchors(a[prefix:a_end], b[prefix:b_end])
+        for i, j in [(i + prefix, j + prefix) for i, j in anchors] + [(a_end, b_end)]:
+            changes.extend(diff_gap(a, a1, i, b, b1, j))
+            a1 = i + 1
+            b1 = j + 1
+
+    offsets = [0]
+    for line in a:
+        offsets.append(offsets[-1] + len(line))
+    return [(offsets[a1], offsets[a2], ''.join(b[b1:b2])) for a1, a2, b1, b2 in changes]
+
+
+def apply_hunks(text, hunks):
+    """Apply hunks from `line_hunks` to the text."""
+
+    for start, end, replacement in reversed(hunks):
+        text = text[:start] + replacement + text[end:]
+    return text
@@ -6,11 +6,39 @@ Copyright (c) 2014 - 2015 Isaac Muse <isaacmuse@gmail.com>
 """
 import sublime
 import sublime_plugin
-from os.path import join, basename, dirname, exists, isfile, splitext
+import codecs
+from collections import deque, namedtuple, OrderedDict
+from concurrent.futures import Future, CancelledError
+from os.path import join, basename, dirname, exists, expanduser, getsize, isfile, splitext
 import _thread as thread
+import mmap
+import shutil
 import subprocess
 import sys
+import tempfile
+import threading
+import time
 import traceback
+import webbrowser
+from .lib.binary import BinaryResolver, BinaryError
+from .lib.daemon import PyMdownDaemonPool
+from .lib.scheduler import JobScheduler
+from .lib.batch import expand_paths, convert_files, arg_max, cpu_count
+from .lib.discovery import FileDiscovery
+from .lib.manifest import BuildManifest, file_stat, output_updated
+from .lib.cache import RenderCache, make_key
+from .lib.progress import BatchProgress
+from .lib.server import PreviewServer
+from .lib.critic import critic_dump
+from .lib.textdiff import line_hunks
+from .lib.blocks import PartialRenderer
+from .lib.stats import ConversionStats
+from .lib.process import ConversionTimeout, kill_process_tree, new_group_kwargs
+try:
+    # Needs Python 3.5+, so not available in Sublime Text 3.
+    from .lib.aio import AsyncioBackend
+except Exception:
+    AsyncioBackend = None
 try:
     from SubNotify.sub_notify import SubNotifyIsReadyCommand as Notify
 except Exception:
@@ -36,9 +64,130 @@ DANGER_PATTER_MSG = \
 `
 This may try and convert more than you bargined for.'''
 
+DEFAULT_DAEMON_ENTRY = "pymdown.__main__:main"
+
+# Seconds the login shell gets to report its PATH.
+ENVIRON_PROBE_TIMEOUT = 10
+
+# Lines of output kept from each streamed batch process for the final report.
+OUTPUT_TAIL_LINES = 50
+
+# Characters written at a time when spilling a large buffer to a temp file.
+LARGE_WRITE_SIZE = 1024 * 1024
+
+# Polls a sidecar script written after every render and reloads the page
+# (keeping the scroll position) when the render version changes.
+LIVE_RELOAD_SCRIPT = '''<script>
+(function () {
+    var version = %(version)d, key = 'pymdown-live-%(view)d';
+    var y = window.sessionStorage ? sessionStorage.getItem(key) : null;
+    if (y !== null) {
+        window.addEventListener('load', function () { window.scrollTo(0, parseInt(y, 10)); });
+    }
+    window.pymdownLiveReload = function (v) {
+        if (v !== version) {
+            if (window.sessionStorage) { sessionStorage.setItem(key, window.pageYOffset); }
+            window.location.reload();
+        }
+    };
+    setInterval(function () {
+        var s = document.createElement('script');
+        s.src = '%(script)s?' + new Date().getTime();
+        s.onload = s.onerror = function () { s.parentNode.removeChild(s); };
+        document.body.appendChild(s);
+    }, %(interval)d);
+})();
+</script>
+'''
+
+
+def platform_value(value):
+    """Get the value for the current platform from a per platform setting."""
+
+    return value.get(_PLATFORM, "")
+
+
+# Settings held by the snapshot: name, default, and conversion.
+SETTING_KEYS = (
+    ("critic_mode", "view", str),
+    ("critic_engine", "plugin", str),
+    ("binary", {}, platform_value),
+    ("worker_mode", "process", str),
+    ("daemon_python", {}, platform_value),
+    ("daemon_entry", DEFAULT_DAEMON_ENTRY, str),
+    ("max_workers", 2, int),
+    ("conversion_timeout", 60, float),
+    ("batch_timeout", 0, float),
+    ("execution_backend", "threads", str),
+    ("asyncio_limit", 0, int),
+    ("batch_convert_patterns", [], tuple),
+    ("batch_recursive", True, bool),
+    ("batch_ignore_patterns", [], tuple),
+    ("batch_processes", 0, int),
+    ("batch_files_per_process", 0, int),
+    ("batch_incremental", True, bool),
+    ("render_cache_size", 8, float),
+    ("render_cache_disk", False, bool),
+    ("render_cache_disk_size", 64, float),
+    ("partial_render", False, bool),
+    ("large_document_size", 4, float),
+    ("live_preview_delay", 50, int),
+    ("live_preview_poll", 100, int),
+    ("preview_server", False, bool),
+    ("preview_server_port", 0, int),
+    ("use_sub_notify", False, bool)
+)
+
+
+class SettingsSnapshot(namedtuple('SettingsSnapshot', [key[0] for key in SETTING_KEYS])):
+
+    """Immutable snapshot of the PyMdown settings."""
+
+    __slots__ = ()
 
-def get_environ():
-    """Get environment and force utf-8."""
+    @classmethod
+    def load(cls, settings):
+        """Read and convert the settings."""
+
+        return cls(*[convert(settings.get(name, default)) for name, default, convert in SETTING_KEYS])
+
+
+class PyMdownSettings(object):
+
+    """
+    Process wide snapshot of the PyMdown settings.
+
+    The snapshot is only replaced when the settings change,
+    so worker threads can read it without touching the Sublime API.
+    """
+
+    snapshot = None
+
+    @classmethod
+    def get(cls):
+        """Get the snapshot, loading it if it hasn't been yet."""
+
+        snapshot = cls.snapshot
+        if snapshot is None:
+            snapshot = cls.refresh()
+        return snapshot
+
+    @classmethod
+    def refresh(cls):
+        """Load a new snapshot."""
+
+        cls.snapshot = SettingsSnapshot.load(sublime.load_settings("pymdown.sublime-settings"))
+        return cls.snapshot
+
+
+def get_settings():
+    """Get the settings snapshot."""
+
+    return PyMdownSettings.get()
+
+
+def probe_environ():
+    """Probe the login shell for the environment and force utf-8."""
 
     import os
     env = {}
@@ -48,9 +197,18 @@ def get_environ():
         shell = env['SHELL']
         p = subprocess.Popen(
             [shell, '-l', '-c', 'echo "#@#@#${PATH}#@#@#"'],
-            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            **new_group_kwargs()
         )
-        result = p.communicate()[0].decode('utf8').split('#@#@#')
+        try:
+            output = p.communicate(timeout=ENVIRON_PROBE_TIMEOUT)[0]
+        except subprocess.TimeoutExpired:
+            # A hanging shell profile must not block every conversion; use Sublime's PATH.
+            kill_process_tree(p.pid)
+            p.communicate()
+            log("Login shell did not respond within %d seconds, using the default PATH." % ENVIRON_PROBE_TIMEOUT)
+            output = b''
+        result = output.decode('utf8').split('#@#@#')
         if len(result) > 1:
             bin_paths = result[1].split(':')
             if len(bin_paths):
@@ -63,6 +221,239 @@ def get_environ():
     return env
 
 
+class PyMdownEnviron(object):
+
+    """
+    Process wide cache of the login shell environment.
+
+    Probing the login shell can be slow, so it is done once
+    (in the background on plugin load) and reused until invalidated.
+    """
+
+    lock = threading.Lock()
+    env = None
+    probe_time = 0.0
+
+    @classmethod
+    def get(cls):
+        """Get a copy of the cached environment, probing it if needed."""
+
+        with cls.lock:
+            if cls.env is None:
+                start = time.time()
+                cls.env = probe_environ()
+                cls.probe_time = time.time() - start
+                log("Environment probed in %.3f seconds." % cls.probe_time)
+            env = dict(cls.env)
+        return env
+
+    @classmethod
+    def clear(cls):
+        """Invalidate the cached environment."""
+
+        with cls.lock:
+            cls.env = None
+
+    @classmethod
+    def refresh(cls):
+        """Invalidate the cached environment and probe it again in the background."""
+
+        cls.clear()
+        thread.start_new_thread(cls.get, ())
+
+
+def get_environ():
+    """Get environment and force utf-8."""
+
+    return PyMdownEnviron.get()
+
+
+class PyMdownBinary(object):
+
+    """
+    Process wide cache of the resolved pymdown binary.
+
+    The binary is looked up on the cached PATH and probed in the background on plugin load,
+    so conversions only have to check that it hasn't changed.
+    """
+
+    resolver = BinaryResolver()
+
+    @classmethod
+    def get(cls):
+        """Get the resolved binary, raising `BinaryError` if it can't be used."""
+
+        return cls.resolver.resolve(get_settings().binary, get_environ(), **get_popen_kwargs())
+
+    @classmethod
+    def probe(cls):
+        """Resolve the binary and log the result."""
+
+        try:
+            info = cls.get()
+            log("Found pymdown %s at %s." % (info.version or "(unknown version)", info.path))
+        except BinaryError as e:
+            log(str(e))
+
+    @classmethod
+    def refresh(cls):
+        """Forget the resolved binary and resolve it again in the background."""
+
+        cls.resolver.clear()
+        thread.start_new_thread(cls.probe, ())
+
+
+def get_popen_kwargs():
+    """
+    Get platform specific keyword arguments for `Popen`.
+
+    Processes get their own process group so they can be killed along with their children.
+    """
+
+    kwargs = new_group_kwargs()
+    if _PLATFORM == "windows":
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        kwargs['startupinfo'] = startupinfo
+    return kwargs
+
+
+class PyMdownAsyncio(object):
+
+    """Manage the shared asyncio execution backend."""
+
+    lock = threading.Lock()
+    backend = None
+    warned = False
+
+    @classmethod
+    def get(cls):
+        """Get the backend if it is enabled and available."""
+
+        settings = get_settings()
+        if settings.execution_backend != "asyncio":
+            return None
+        if AsyncioBackend is None:
+            if not cls.warned:
+                cls.warned = True
+                log("The asyncio execution backend needs Python 3.5+, using threads instead.")
+            return None
+        limit = settings.asyncio_limit
+        with cls.lock:
+            if cls.backend is None:
+                cls.backend = AsyncioBackend(limit if limit > 0 else cpu_count())
+            backend = cls.backend
+        return backend
+
+    @classmethod
+    def stop(cls):
+        """Stop the backend."""
+
+        with cls.lock:
+            if cls.backend is not None:
+                cls.backend.stop()
+                cls.backend = None
+
+
+class PyMdownPreviewServer(object):
+
+    """Manage the shared preview server."""
+
+    lock = threading.Lock()
+    server = None
+
+    @classmethod
+    def get(cls):
+        """Get the server if it is enabled, starting it if needed."""
+
+        settings = get_settings()
+        if not settings.preview_server:
+            return None
+        with cls.lock:
+            if cls.server is None:
+                try:
+                    cls.server = PreviewServer(settings.preview_server_port)
+                except OSError:
+                    log(traceback.format_exc())
+                    return None
+            server = cls.server
+        return server
+
+    @classmethod
+    def remove(cls, view_id):
+        """Forget a view's page if the server is running."""
+
+        with cls.lock:
+            server = cls.server
+        if server is not None:
+            server.remove(view_id)
+
+    @classmethod
+    def stop(cls):
+        """Stop the server."""
+
+        with cls.lock:
+            if cls.server is not None:
+                cls.server.stop()
+                cls.server = None
+
+
+class PyMdownDaemonManager(object):
+
+    """
+    Manage the shared pool of PyMdown conversion daemons.
+
+    There is a daemon for every job scheduler thread (`max_workers`),
+    so conversions running at the same time never wait on each other.
+    The server source is loaded by `load` on the main thread, as Sublime's
+    resource API must not be called from the worker threads.
+    """
+
+    lock = threading.Lock()
+    pool = None
+    source = None
+
+    @classmethod
+    def load(cls):
+        """Load the conversion server's source from the package (main thread only)."""
+
+        try:
+            source = sublime.load_resource("Packages/%s/lib/pymdown_server.py" % __package__)
+        except Exception as e:
+            log("The conversion server could not be loaded, daemon mode is unavailable: %s" % e)
+            source = None
+        with cls.lock:
+            cls.source = source
+
+    @classmethod
+    def get(cls):
+        """Get the daemon pool, replacing it if the settings it was started with have changed."""
+
+        settings = get_settings()
+        python = settings.daemon_python
+        entry = settings.daemon_entry
+        with cls.lock:
+            if cls.source is None:
+                raise RuntimeError("The conversion server could not be loaded, daemon mode is unavailable.")
+            cmd = [python, '-c', cls.source, entry]
+            size = max(1, settings.max_workers)
+            if cls.pool is None or cls.pool.cmd != cmd or cls.pool.size != size:
+                if cls.pool is not None:
+                    cls.pool.stop()
+                cls.pool = PyMdownDaemonPool(cmd, size, env=get_environ(), **get_popen_kwargs())
+            pool = cls.pool
+        return pool
+
+    @classmethod
+    def stop(cls):
+        """Stop the daemons."""
+
+        with cls.lock:
+            if cls.pool is not None:
+                cls.pool.stop()
+                cls.pool = None
+
+
 ###############################
 # General Helper Methods
 ###############################
@@ -87,8 +478,7 @@ def err_dialog(msg):
 def notify(msg):
     """Notification message."""
 
-    settings = sublime.load_settings("pymdown.sublime-settings")
-    if settings.get("use_sub_notify", False) and Notify.is_ready():
+    if get_settings().use_sub_notify and Notify.is_ready():
         sublime.run_command("sub_notify", {"title": "PyMdown", "msg": msg})
     else:
         status_notify(msg)
@@ -97,8 +487,7 @@ def notify(msg):
 def error(msg):
     """Error message."""
 
-    settings = sublime.load_settings("pymdown.sublime-settings")
-    if settings.get("use_sub_notify", False) and Notify.is_ready():
+    if get_settings().use_sub_notify and Notify.is_ready():
         sublime.run_command("sub_notify", {"title": "PyMdown", "msg": msg, "level": "error"})
     else:
         err_dialog(msg)
@@ -117,28 +506,55 @@ def parse_file_name(file_name):
 
 
 def handle_line_endings(text):
-    """Strip out carriage returns."""
+    """Strip out carriage returns (without copying the text if there are none)."""
+
+    return text.replace('\r', '') if '\r' in text else text
+
+
+def batch_report_path():
+    """Get the path of the JSON report of the last batch conversion."""
+
+    return join(sublime.cache_path(), 'PyMdown', 'batch_report.json')
+
+
+def pymdown_user_path():
+    """Get PyMdown's own folder, which holds its default settings file and usually its templates."""
 
-    return text.replace('\r', '')
+    return join(expanduser('~'), '.PyMdown')
+
+
+def decode_mapped(f):
+    """Decode a file as utf-8 straight from a memory map of it."""
+
+    f.flush()
+    if not getsize(f.name):
+        return ''
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        return str(m, 'utf-8')
 
 
 ###############################
 # PyMdown Worker (Threaded by calls)
 ###############################
+scheduler = JobScheduler(log=log)
+render_cache = RenderCache()
+partial_renderer = PartialRenderer()
+stats = ConversionStats()
+discovery = FileDiscovery()
+
+
 class PyMdownWorker(object):
 
     """Worker object that calls PyMdown and returns results."""
 
-    working = False
-
     def __init__(self, **kwargs):
         """Initialize."""
 
-        settings = sublime.load_settings("pymdown.sublime-settings")
-        self.binary = settings.get("binary", {}).get(_PLATFORM, "")
+        settings = get_settings()
+        self.binary = settings.binary
         self.paths = kwargs.get('paths', [])
-        self.buffer = kwargs.get('buffer', [])
-        self.patterns = list(kwargs.get('patterns', settings.get('batch_convert_patterns', [])))
+        self.buffer = kwargs.get('buffer', '')
+        self.patterns = list(kwargs.get('patterns', settings.batch_convert_patterns))
         self.critic_mode = kwargs.get('critic_mode', 'view')
         self.critic_dump = bool(kwargs.get('critic_dump', False))
         self.title = kwargs.get('title', None)
@@ -148,9 +564,38 @@ class PyMdownWorker(object):
         self.settings = kwargs.get('settings', None)
         self.quiet = bool(kwargs.get('quiet', False))
         self.callback = kwargs.get('callback', None)
+        self.output_callback = kwargs.get('output_callback', None)
+        self.progress_callback = kwargs.get('progress_callback', None)
+        self.progress = None
+        self.timeout = settings.batch_timeout if self.batch else settings.conversion_timeout
+        self.deadline = None
         self.plain = bool(kwargs.get('plain', False))
         self.force_stdout = bool(kwargs.get('force_stdout', False))
         self.force_no_template = bool(kwargs.get('force_no_template', False))
+        self.command = kwargs.get('command', 'batch' if self.batch else 'convert')
+        # Batch chunks already convert many files per process, so they always use processes
+        # (in parallel) and leave the daemons free for previews.
+        self.use_daemon = settings.worker_mode == "daemon" and not self.batch
+        self.backend = None if self.use_daemon else PyMdownAsyncio.get()
+        self.partial = settings.partial_render and not self.critic_dump
+        self.large_size = int(settings.large_document_size * 1024 * 1024)
+        self.batch_processes = settings.batch_processes
+        self.batch_files_per_process = settings.batch_files_per_process
+        self.recursive = settings.batch_recursive
+        self.ignore = list(settings.batch_ignore_patterns)
+        self.incremental = settings.batch_incremental
+        if self.preview or kwargs.get('force', False):
+            self.incremental = False
+        self.manifest_path = join(sublime.cache_path(), 'PyMdown', 'batch_manifest.json')
+        self.report_path = batch_report_path()
+        self.cancelled = False
+        self.processes = set()
+        self.futures = set()
+        self.lock = threading.Lock()
+        self.file_results = []
+        self.timings = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
         self.results = ''
         self.cmd = []
 
@@ -165,7 +610,7 @@ class PyMdownWorker(object):
             if self.basepath:
                 cmd += ["--basepath", self.basepath]
             if self.settings:
-                cmd.append += ["-s", self.settings]
+                cmd += ["-s", self.settings]
             if self.critic_mode == 'accept':
                 cmd.append('-a')
             elif self.critic_mode == 'reject':
@@ -188,100 +633,515 @@ class PyMdownWorker(object):
                 cmd.append('--critic-dump')
         return cmd
 
-    def get_process(self, cmd):
+    def add_timing(self, stage, elapsed, bytes_in=0, bytes_out=0):
+        """Add time spent in a stage (and bytes sent and received)."""
+
+        with self.lock:
+            self.timings[stage] = self.timings.get(stage, 0.0) + elapsed
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+
+    def timed(self, stage, func, *args, **kwargs):
+        """Call a function and add the time it took to the stage."""
+
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.add_timing(stage, time.perf_counter() - start)
+
+    def get_process(self, cmd, stdout=subprocess.PIPE):
         """Get the subprocess object."""
 
-        if _PLATFORM == "windows":
-            startupinfo = subprocess.STARTUPINFO()
-            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-            p = subprocess.Popen(
-                cmd, startupinfo=startupinfo,
-                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-                env=get_environ()
+        env = self.timed('environ', get_environ)
+        p = self.timed(
+            'spawn', subprocess.Popen,
+            cmd,
+            stdin=subprocess.PIPE, stdout=stdout, stderr=subprocess.PIPE,
+            env=env, **get_popen_kwargs()
+        )
+        with self.lock:
+            self.processes.add(p)
+        if self.cancelled:
+            self.kill(p, 'cancelled')
+        return p
+
+    def remaining(self):
+        """Get the seconds left before the job times out, or `None` if it can't."""
+
+        if self.deadline is None:
+            return None
+        return max(0.001, self.deadline - time.perf_counter())
+
+    def is_stopped(self):
+        """Check if the job was cancelled or has run out of time, so no more processes should start."""
+
+        return self.cancelled or (self.deadline is not None and time.perf_counter() >= self.deadline)
+
+    def timeout_message(self):
+        """Message for a conversion that timed out."""
+
+        return "Conversion timed out after %.1f seconds!\n" % self.timeout
+
+    def kill(self, p, reason):
+        """Kill a process and its children."""
+
+        if p.poll() is None:
+            kill_process_tree(p.pid)
+            stats.count('killed (%s)' % reason)
+
+    def release_process(self, p):
+        """Forget about a finished process."""
+
+        with self.lock:
+            self.processes.discard(p)
+
+    def cancel(self):
+        """Cancel the conversion, killing any running processes."""
+
+        self.cancelled = True
+        with self.lock:
+            processes = list(self.processes)
+            futures = list(self.futures)
+        for p in processes:
+            self.kill(p, 'cancelled')
+        for future in futures:
+            if future.cancel():
+                stats.count('killed (cancelled)')
+
+    def track_future(self, future):
+        """Track a future from the asyncio backend so it can be cancelled."""
+
+        with self.lock:
+            self.futures.add(future)
+        future.add_done_callback(self.release_future)
+        if self.cancelled:
+            future.cancel()
+        return future
+
+    def release_future(self, future):
+        """Forget about a finished future."""
+
+        with self.lock:
+            self.futures.discard(future)
+        if not future.cancelled() and isinstance(future.exception(), ConversionTimeout):
+            stats.count('killed (timeout)')
+
+    def submit_async(self, cmd):
+        """Start a batch conversion on the asyncio backend."""
+
+        on_line = self.output_callback if self.output_callback is not None else lambda line: None
+        tail_lines = OUTPUT_TAIL_LINES if self.output_callback is not None else None
+        return self.track_future(
+            self.backend.stream(
+                cmd, on_line, tail_lines, timeout=self.remaining(), env=get_environ(), **get_popen_kwargs()
+            )
+        )
+
+    def request_daemon(self, cmd, data=b''):
+        """Send the conversion to the PyMdown daemon."""
+
+        try:
+            returncode, results, errors = self.timed(
+                'daemon', PyMdownDaemonManager.get().request, cmd[1:], data, self.remaining()
             )
+        except ConversionTimeout:
+            stats.count('killed (timeout)')
+            raise
+        output = results + errors
+        self.add_timing('decode', 0.0, len(data), len(output))
+        return returncode, self.timed('decode', output.decode, "utf-8")
+
+    def communicate(self, p, data=None, decode=True):
+        """Send data to the process and return its decoded output."""
+
+        try:
+            results, errors = self.timed('pipe', p.communicate, data, self.remaining())
+        except subprocess.TimeoutExpired:
+            self.kill(p, 'timeout')
+            p.communicate()
+            raise ConversionTimeout(self.timeout_message())
+        return self.decode_output(results, errors, data) if decode else errors
+
+    def decode_output(self, results, errors, data=None):
+        """Combine and decode the output of a process."""
+
+        output = results + errors
+        self.add_timing('pipe', 0.0, len(data) if data else 0, len(output))
+        return self.timed('decode', output.decode, "utf-8")
+
+    def get_cache_key(self, cmd, data):
+        """
+        Get the render cache key for the conversion.
+
+        Only conversions that just return their output are cached.
+        Ones that write files or open the browser are not.
+        """
+
+        if not self.force_stdout or self.preview:
+            return None
+        return make_key([cmd, file_stat(self.settings) if self.settings else None], data)
+
+    def convert_data(self, cmd, data):
+        """Convert the data with PyMdown and return the return code and output."""
+
+        if self.use_daemon:
+            return self.request_daemon(cmd, data)
+        elif self.backend is not None:
+            future = self.backend.communicate(
+                cmd, data, timeout=self.remaining(), env=self.timed('environ', get_environ), **get_popen_kwargs()
+            )
+            returncode, results, errors = self.timed('pipe', self.track_future(future).result)
+            return returncode, self.decode_output(results, errors, data)
         else:
-            p = subprocess.Popen(
-                cmd,
-                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-                env=get_environ()
+            p = self.get_process(cmd)
+            try:
+                output = self.communicate(p, data)
+            finally:
+                self.release_process(p)
+            return p.returncode, output
+
+    def submit_data(self, cmd, data, key):
+        """
+        Start converting the data on the asyncio backend without waiting for it.
+
+        Returns a future for the return code, which is done once the output
+        has been added to the results (and the render cache).
+        """
+
+        start = time.perf_counter()
+        future = self.track_future(
+            self.backend.communicate(
+                cmd, data, timeout=self.remaining(), env=self.timed('environ', get_environ), **get_popen_kwargs()
             )
-        return p
+        )
+        done = Future()
 
-    def execute_buffer(self, cmd):
-        """Execute on a buffer."""
+        def finish(future):
+            self.add_timing('pipe', time.perf_counter() - start)
+            returncode = 1
+            try:
+                returncode, results, errors = future.result()
+                output = self.decode_output(results, errors, data)
+                self.results += output
+                if key is not None and returncode == 0:
+                    render_cache.set(key, output)
+            except CancelledError:
+                pass
+            except ConversionTimeout:
+                self.results += self.timeout_message()
+            except Exception:
+                self.results += str(traceback.format_exc())
+            done.set_result(returncode)
+
+        future.add_done_callback(finish)
+        return done
+
+    def convert_partial(self, cmd, text):
+        """
+        Convert the text a block at a time, only rendering blocks that changed.
+
+        Returns `None` if the text has to be converted in full.
+        """
+
+        prefix = repr([cmd, file_stat(self.settings) if self.settings else None])
+        result = self.timed(
+            'partial', partial_renderer.render, text, prefix,
+            lambda markdown: self.convert_data(cmd, markdown.encode('utf-8'))
+        )
+        stats.count('partial renders' if result is not None else 'full renders')
+        return result
+
+    def is_large(self):
+        """Check if the buffer should be converted through temp files."""
+
+        if not self.force_stdout or self.preview or self.use_daemon:
+            return False
+        return self.large_size > 0 and len(self.buffer) >= self.large_size
+
+    def execute_large(self, cmd):
+        """
+        Convert a large buffer through temp files instead of pipes.
+
+        The buffer is written out a slice at a time and pymdown reads it by path.
+        Its output goes to a temp file that is memory mapped and decoded once,
+        so only about one copy of the document is held at a time.
+        Large documents skip the render cache, they would just flush it.
+        """
+
+        folder = tempfile.mkdtemp(prefix='pymdown-')
+        try:
+            source = join(folder, 'buffer.md')
+            start = time.perf_counter()
+            with open(source, 'w', encoding='utf-8', newline='') as f:
+                for index in range(0, len(self.buffer), LARGE_WRITE_SIZE):
+                    f.write(self.buffer[index:index + LARGE_WRITE_SIZE])
+                size = f.tell()
+            self.buffer = ''
+            self.add_timing('spill', time.perf_counter() - start, size)
+            with open(join(folder, 'output.html'), 'w+b') as out:
+                p = self.get_process(cmd + [source], stdout=out)
+                try:
+                    errors = self.communicate(p, decode=False)
+                finally:
+                    self.release_process(p)
+                output = self.timed('decode', decode_mapped, out)
+                self.add_timing('decode', 0.0, 0, getsize(out.name))
+            return p.returncode, output + errors.decode('utf-8')
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+
+    def execute_buffer(self, cmd, detach=False):
+        """
+        Execute on a buffer.
+
+        With `detach`, a conversion on the asyncio backend isn't waited for;
+        a future for the return code is returned instead (see `submit_data`).
+        Partial renders are always waited for.
+        """
 
         returncode = 0
         try:
-            p = self.get_process(cmd)
-            for line in self.buffer:
-                p.stdin.write(line.encode('utf-8'))
-            results, errors = p.communicate()
-            self.results += (results + errors).decode("utf-8")
-            returncode = p.returncode
+            if self.is_large():
+                returncode, output = self.execute_large(cmd)
+                self.results += output
+                return returncode
+            # Encode once and drop the text so only one copy is held
+            # (unless it is needed to render the changed blocks).
+            data = self.buffer.encode('utf-8')
+            text = self.buffer if self.partial else None
+            self.buffer = ''
+            key = self.get_cache_key(cmd, data)
+            output = self.timed('cache', render_cache.get, key) if key is not None else None
+            if output is not None:
+                self.results += output
+                return 0
+            result = self.convert_partial(cmd, text) if key is not None and text is not None else None
+            del text
+            if result is None and detach and self.backend is not None:
+                return self.submit_data(cmd, data, key)
+            returncode, output = result if result is not None else self.convert_data(cmd, data)
+            self.results += output
+            if key is not None and returncode == 0:
+                render_cache.set(key, output)
+        except ConversionTimeout:
+            self.results += self.timeout_message()
+            returncode = 1
+        except CancelledError:
+            # The asyncio backend was stopped.
+            returncode = 1
         except Exception:
             self.results += str(traceback.format_exc())
             returncode = 1
         return returncode
 
+    def read_stream(self, pipe, tail):
+        """Decode a process pipe line by line as it arrives, passing each line on."""
+
+        decoder = codecs.getincrementaldecoder('utf-8')('replace')
+        for raw in iter(pipe.readline, b''):
+            self.add_timing('pipe', 0.0, 0, len(raw))
+            line = decoder.decode(raw)
+            tail.append(line)
+            self.output_callback(line)
+        line = decoder.decode(b'', final=True)
+        if line:
+            tail.append(line)
+            self.output_callback(line)
+
+    def execute_stream(self, cmd):
+        """
+        Execute on file paths, streaming the output as it arrives.
+
+        Each line is handed to the output callback, and only the last few lines
+        are kept, so memory use doesn't grow with the amount of output.
+        """
+
+        tail = deque(maxlen=OUTPUT_TAIL_LINES)
+        try:
+            p = self.get_process(cmd)
+            try:
+                start = time.perf_counter()
+                p.stdin.close()
+                readers = [
+                    threading.Thread(target=self.read_stream, args=(pipe, tail))
+                    for pipe in (p.stdout, p.stderr)
+                ]
+                for reader in readers:
+                    reader.start()
+                try:
+                    p.wait(self.remaining())
+                except subprocess.TimeoutExpired:
+                    self.kill(p, 'timeout')
+                    p.wait()
+                    raise ConversionTimeout(self.timeout_message())
+                finally:
+                    # Killing the process tree closes the pipes, which ends the readers.
+                    for reader in readers:
+                        reader.join()
+                self.add_timing('pipe', time.perf_counter() - start)
+            finally:
+                self.release_process(p)
+            returncode = p.returncode
+        except ConversionTimeout:
+            tail.append(self.timeout_message())
+            self.output_callback(self.timeout_message())
+            returncode = 1
+        except Exception:
+            tail.append(str(traceback.format_exc()))
+            returncode = 1
+        return returncode, ''.join(tail)
+
     def execute(self, cmd):
-        """Execute on file paths."""
+        """Execute on file paths and return the return code and output."""
+
+        if self.output_callback is not None:
+            return self.execute_stream(cmd)
 
-        returncode = 0
         try:
             p = self.get_process(cmd)
-            results, errors = p.communicate()
-            self.results += (results + errors).decode("utf-8")
+            try:
+                output = self.communicate(p)
+            finally:
+                self.release_process(p)
             returncode = p.returncode
+        except ConversionTimeout:
+            output = self.timeout_message()
+            returncode = 1
         except Exception:
-            self.results += str(traceback.format_exc())
+            output = str(traceback.format_exc())
             returncode = 1
-        return returncode
+        return returncode, output
 
-    def process_pattern(self, pth):
-        """Process file patterns."""
+    def convert_paths(self):
+        """
+        Convert the batch paths.
+
+        Paths are expanded into individual files which are packed into chunks,
+        and the chunks are converted in parallel, one `pymdown` process per chunk.
+        """
 
-        if isfile(pth):
-            ptrns = [pth]
+        files = expand_paths(self.paths, self.patterns, discovery, self.ignore, self.recursive)
+        manifest = None
+        skipped = 0
+        if self.incremental:
+            manifest = BuildManifest(
+                self.manifest_path,
+                {
+                    "cmd": self.cmd, "settings": self.settings, "critic_mode": self.critic_mode,
+                    "config_folder": pymdown_user_path()
+                }
+            )
+            dirty = [f for f in files if not isfile(f) or manifest.is_dirty(f)]
+            skipped = len(files) - len(dirty)
+            if skipped:
+                self.results += "Skipped %d unchanged file(s).\n" % skipped
+            files = dirty
+
+        self.progress = BatchProgress(len(files), skipped)
+        self.batch_start = time.time()
+        self.file_results = convert_files(
+            files, self.cmd, self.execute,
+            workers=self.batch_processes, cancelled=self.is_stopped,
+            limit=arg_max(get_environ()), max_files=self.batch_files_per_process,
+            submit=self.submit_async if self.backend is not None else None,
+            on_result=self.report_progress
+        )
+        self.progress.finish()
+        if self.progress_callback is not None:
+            self.progress_callback(self.progress.status())
+        try:
+            self.progress.save(self.report_path)
+        except Exception:
+            log(traceback.format_exc())
+        if self.output_callback is not None:
+            # Output was already passed on as it arrived; keep what failed for the report.
+            self.results += ''.join(r.output for r in self.file_results if r.returncode)
         else:
-            ptrns = [join(pth, p) for p in self.patterns]
-        return ptrns
+            self.results += ''.join(r.output for r in self.file_results)
+
+        if manifest is not None:
+            try:
+                for r in self.file_results:
+                    for path in r.paths:
+                        if not isfile(path):
+                            continue
+                        if path in r.failed:
+                            manifest.forget(path)
+                        else:
+                            manifest.record(path)
+                manifest.save()
+            except Exception:
+                log(traceback.format_exc())
+        converted = sum(len(r.paths) for r in self.file_results)
+        return any(r.returncode for r in self.file_results) or converted != len(files)
+
+    def report_progress(self, result):
+        """Record a finished chunk and pass on the progress (called from worker threads)."""
+
+        if result.returncode and not self.preview:
+            # The process failed, but some of its files may have converted fine.
+            # Previews write their HTML elsewhere, so there all files are counted as failed.
+            result.failed = [p for p in result.paths if not output_updated(p, self.batch_start)]
+        if self.progress.update(result) and self.progress_callback is not None:
+            self.progress_callback(self.progress.status())
 
     def call_callback(self, err):
-        """Call the callback function."""
+        """Call the callback function and record the conversion's stats."""
 
-        if self.callback and callable(self.callback):
-            sublime.set_timeout(
-                lambda results=self.results, err=err: self.callback(self.results, err),
-                0
-            )
+        def callback():
+            if self.callback and callable(self.callback):
+                self.timed('callback', self.callback, self.results, err)
+            stats.record(self.command, self.timings, self.bytes_in, self.bytes_out, err)
+
+        sublime.set_timeout(callback, 0)
 
     def run(self):
-        """Run PyMdown on provided buffer or paths."""
+        """
+        Run PyMdown on provided buffer or paths.
+
+        A buffer conversion on the asyncio backend finishes in the background,
+        so this returns a future for it instead of holding the scheduler thread.
+        """
 
+        start = time.perf_counter()
+        if self.timeout > 0:
+            self.deadline = start + self.timeout
         err = False
         self.cmd = self.parse_options()
         self.results = ''
-        if PyMdownWorker.working:
-            self.results = "PyMdown Worker is already running!"
-            self.call_callback(True)
-        else:
-            PyMdownWorker.working = True
-            if len(self.cmd) and len(self.buffer):
-                if self.execute_buffer(self.cmd):
-                    err = True
-            if len(self.cmd) and len(self.paths):
-                for pth in self.paths:
-                    if len(self.patterns):
-                        self.cmd += self.process_pattern(pth)
-                    elif exists(pth):
-                        self.cmd.append(pth)
-                    else:
-                        continue
-
-                    if self.execute(self.cmd):
-                        err = True
+        if len(self.cmd) and not self.use_daemon:
+            try:
+                info = self.timed('binary', PyMdownBinary.get)
+                self.cmd[0] = info.path
+                info.check(self.cmd)
+            except BinaryError as e:
+                self.results = str(e)
+                self.cmd = []
+                err = True
+        if len(self.cmd) and len(self.buffer):
+            returncode = self.execute_buffer(self.cmd, detach=not len(self.paths))
+            if isinstance(returncode, Future):
+                returncode.add_done_callback(lambda future: self.finish(start, err or bool(future.result())))
+                return returncode
+            if returncode:
+                err = True
+        if len(self.cmd) and len(self.paths):
+            if self.convert_paths():
+                err = True
+        self.finish(start, err)
+
+    def finish(self, start, err):
+        """Record the total time and call back unless the conversion was cancelled."""
+
+        self.add_timing('total', time.perf_counter() - start)
+        if not self.cancelled:
             self.call_callback(err)
-            PyMdownWorker.working = False
+
+    def submit(self, key=None):
+        """Queue the conversion on the scheduler."""
+
+        return scheduler.submit(self.run, key=key, cancel=self.cancel)
 
 
 ###############################
@@ -293,6 +1153,10 @@ BATCH_DIR = 2
 BATCH_MIXED = 3
 BATCH_MISSING = 4
 
+# Seconds the classification of a sidebar selection is remembered.
+# Sublime asks for it again every time the sidebar menu is built.
+BATCH_TYPE_TTL = 2.0
+
 
 class PyMdownBatchCommand(sublime_plugin.WindowCommand):
 
@@ -301,22 +1165,47 @@ class PyMdownBatchCommand(sublime_plugin.WindowCommand):
     kind = None
     CONVERT = "Convert"
     PREVIEW = "Preview"
+    REBUILD = "Rebuild"
+    type_lock = threading.Lock()
+    type_cache = OrderedDict()
 
-    def run(self, paths=[], patterns=None, preview=False):
+    def run(self, paths=[], patterns=None, preview=False, force=False):
         """Run the command."""
 
-        if not PyMdownWorker.working:
-            settings = sublime.load_settings("pymdown.sublime-settings")
-            options = {
-                "paths": paths,
-                "batch": True,
-                "critic_accept": settings.get("critic_mode", 'view'),
-                "preview": preview,
-                "callback": self.callback
-            }
-            if patterns is not None:
-                options['patterns'] = patterns
-            thread.start_new_thread(PyMdownWorker(**options).run, ())
+        options = {
+            "paths": paths,
+            "batch": True,
+            "critic_mode": get_settings().critic_mode,
+            "preview": preview,
+            "force": force,
+            "command": self.name(),
+            "callback": self.callback,
+            "output_callback": self.on_output,
+            "progress_callback": self.on_progress
+        }
+        if patterns is not None:
+            options['patterns'] = patterns
+        self.panel = self.window.create_output_panel('pymdown_batch')
+        self.window.run_command('show_panel', {'panel': 'output.pymdown_batch'})
+        PyMdownWorker(**options).submit()
+
+    def on_output(self, line):
+        """Pass on batch output as it arrives (called from worker threads)."""
+
+        line = handle_line_endings(line).rstrip('\n')
+        if line.strip():
+            print("PyMdown: %s" % line)
+
+    def on_progress(self, status):
+        """Show batch progress (called from worker threads)."""
+
+        sublime.set_timeout(lambda: self.show_progress(status), 0)
+
+    def show_progress(self, status):
+        """Show batch progress in the status bar and the batch output panel."""
+
+        status_notify("PyMdown: %s" % status)
+        self.panel.run_command('append', {'characters': status + '\n', 'force': True, 'scroll_to_end': True})
 
     def report(self, msg, console=False, err=False):
         """Report results."""
@@ -334,8 +1223,32 @@ class PyMdownBatchCommand(sublime_plugin.WindowCommand):
         Determine run type.
 
         Is this a batch run, file run, directory run, etc.
+        The result is remembered for a short time so building the sidebar
+        menu doesn't check every selected path for every menu entry.
         """
 
+        key = tuple(paths)
+        now = time.time()
+        cls = PyMdownBatchCommand
+        with cls.type_lock:
+            entry = cls.type_cache.get(key)
+        if entry is not None and now - entry[0] < BATCH_TYPE_TTL:
+            self.kind = entry[1]
+            return self.kind
+
+        kind = self.classify(paths)
+        with cls.type_lock:
+            cls.type_cache[key] = (now, kind)
+            cls.type_cache.move_to_end(key)
+            while len(cls.type_cache) > 8:
+                cls.type_cache.popitem(last=False)
+        self.kind = kind
+        return kind
+
+    @staticmethod
+    def classify(paths):
+        """Check the paths on disk to classify them."""
+
         kind = BATCH_EMPTY
         has_dirs = False
         has_files = False
@@ -359,40 +1272,43 @@ class PyMdownBatchCommand(sublime_plugin.WindowCommand):
             kind = BATCH_MISSING
         elif kind == BATCH_MISSING and has_dirs:
             kind = BATCH_DIR
-        self.kind = kind
         return kind
 
     def is_enabled(self, *args, **kwargs):
         """Check if the command is enabled."""
 
-        enabled = True
-        if not PyMdownWorker.working:
-            batch_type = self.determine_type(kwargs.get('paths', []))
-            if batch_type in (BATCH_MISSING, BATCH_MIXED, BATCH_EMPTY):
-                enabled = False
-        else:
-            enabled = False
-        return enabled
+        batch_type = self.determine_type(kwargs.get('paths', []))
+        return batch_type not in (BATCH_MISSING, BATCH_MIXED, BATCH_EMPTY)
 
     def description(self, *args, **kwargs):
         """Description for menus."""
 
         description = '%s Folder(s)...'
-        if not PyMdownWorker.working:
-            batch_type = self.determine_type(kwargs.get('paths', []))
-            if batch_type in (BATCH_MISSING, BATCH_MIXED, BATCH_EMPTY):
-                description = 'NA'
-            elif batch_type == BATCH_FILE:
-                description = '%s File(s)...'
-        else:
+        batch_type = self.determine_type(kwargs.get('paths', []))
+        if batch_type in (BATCH_MISSING, BATCH_MIXED, BATCH_EMPTY):
             description = 'NA'
-        return description % (self.PREVIEW if kwargs.get('preview', False) else self.CONVERT)
+        elif batch_type == BATCH_FILE:
+            description = '%s File(s)...'
+        if kwargs.get('preview', False):
+            action = self.PREVIEW
+        elif kwargs.get('force', False):
+            action = self.REBUILD
+        else:
+            action = self.CONVERT
+        return description % action
 
     def callback(self, results, err):
         """To be called after conversion."""
 
         print("error_status %s" % str(err))
-        self.report(results, console=True)
+        if results:
+            self.report(results, console=True)
+        self.panel.run_command(
+            'append', {
+                'characters': 'Report: %s\n' % batch_report_path(),
+                'force': True, 'scroll_to_end': True
+            }
+        )
         if err:
             self.report("Batch Process Completed with Errors!", err=True)
         else:
@@ -411,8 +1327,7 @@ class PyMdownCustomBatchCommand(PyMdownBatchCommand):
 
         self.paths = paths
         self.preview = preview
-        settings = sublime.load_settings("pymdown.sublime-settings")
-        default = ';'.join(settings.get('batch_convert_patterns', []))
+        default = ';'.join(get_settings().batch_convert_patterns)
         view = self.window.show_input_panel(
             "File Pattern", default, self.process_patterns, None, None
         )
@@ -451,14 +1366,17 @@ class PyMdownEditText(sublime_plugin.TextCommand):
         """
         Run the command.
 
-        Can insert or replace.
+        Can insert or replace.  Replacing only edits the lines that changed,
+        which keeps the undo entry small and leaves the rest of the view alone.
         """
 
         cls = PyMdownEditText
         if mode == 'insert':
             self.view.insert(edit, 0, handle_line_endings(cls.wbfr))
         elif mode == 'replace':
-            self.view.replace(edit, sublime.Region(0, self.view.size()), handle_line_endings(cls.wbfr))
+            current = self.view.substr(sublime.Region(0, self.view.size()))
+            for start, end, text in reversed(line_hunks(current, handle_line_endings(cls.wbfr))):
+                self.view.replace(edit, sublime.Region(start, end), text)
         else:
             error('Invalid edit mode!')
             cls.clear_wbfr()
@@ -489,41 +1407,54 @@ class PyMdownCommand(sublime_plugin.TextCommand):
     def setup(self, alternate_settings=None):
         """Setup of genreal settings."""
 
-        settings = sublime.load_settings("pymdown.sublime-settings")
         self.file_name = self.view.file_name()
         title, basepath = parse_file_name(self.view.file_name())
         self.options = {
             'title': title if title is not None else 'Untitled',
             'basepath': basepath,
-            'critic_mode': settings.get("mode", "view"),
+            'critic_mode': get_settings().critic_mode,
             'settings': alternate_settings,
+            'command': self.name(),
             'callback': self.callback
         }
 
     def callback(self, results, err):
         """Callback after conversion."""
 
+    def get_buffer(self, selections=False):
+        """
+        Get the text to convert.
+
+        If `selections` is enabled, the non-empty selections (expanded to full lines)
+        are used if there are any.  Otherwise, the whole view is used.
+        Each region is extracted with a single call.
+        """
+
+        regions = [self.view.line(sel) for sel in self.view.sel() if sel.size()] if selections else []
+        if len(regions) == 0:
+            regions.append(sublime.Region(0, self.view.size()))
+        return ''.join([self.view.substr(region) + '\n' for region in regions])
+
     def convert(self, edit):
         """Convert from Markdown to HTML."""
 
     def call(self):
-        """Call the worker."""
+        """
+        Call the worker.
 
-        if not PyMdownWorker.working:
-            thread.start_new_thread(PyMdownWorker(**self.options).run, ())
-        else:
-            error("PyMdown Worker is already running!")
+        A newer conversion of the same view by the same command replaces an older one.
+        """
+
+        worker = PyMdownWorker(**self.options)
+        # Don't hold on to the buffer, the worker owns it now.
+        self.options.pop('buffer', None)
+        worker.submit(key=(self.__class__.__name__, self.view.id()))
 
     def error_message(self):
         """Error message."""
 
         error(self.message)
 
-    def is_enabled(self, *args, **kwargs):
-        """Check if command is enabled."""
-
-        return not PyMdownWorker.working
-
 
 class PyMdownConvertCommand(PyMdownCommand):
 
@@ -587,7 +1518,15 @@ class PyMdownConvertCommand(PyMdownCommand):
     def output(self, results):
         """Redirect to the appropriate output."""
 
-        if self.target == "browser":
+        if self.target == "browser" and self.server is not None:
+            view_id = self.view.id()
+            self.server.publish(view_id, results)
+            if self.server.is_watched(view_id):
+                notify("Conversion complete!\nPreview updated.")
+            else:
+                webbrowser.open_new_tab(self.server.url(view_id))
+                notify("Conversion complete!\nOpening in browser...")
+        elif self.target == "browser":
             # Nothing to do
             print(results)
             notify("Conversion complete!\nOpening in browser...")
@@ -624,12 +1563,14 @@ class PyMdownConvertCommand(PyMdownCommand):
     def convert(self):
         """Convert the buffer."""
 
-        if self.target == "browser":
+        # Browser previews are served from memory if the preview server is enabled.
+        self.server = PyMdownPreviewServer.get() if self.target == "browser" else None
+        if self.target == "browser" and self.server is None:
             self.options['preview'] = True
         else:
             self.options['quiet'] = True
 
-        if self.target in ("sublime", "clipboard"):
+        if self.target in ("sublime", "clipboard") or self.server is not None:
             self.options['force_stdout'] = True
 
         if self.target == "save":
@@ -644,19 +1585,7 @@ class PyMdownConvertCommand(PyMdownCommand):
         elif self.ignore_template:
             self.options['force_no_template'] = True
 
-        bfr = []
-        sels = self.view.sel()
-        regions = []
-        if len(sels):
-            for sel in sels:
-                if sel.size():
-                    regions.append(sel)
-        if len(regions) == 0:
-            regions.append(sublime.Region(0, self.view.size()))
-        for region in regions:
-            for line in self.view.lines(region):
-                bfr.append(self.view.substr(line) + '\n')
-        self.options['buffer'] = bfr
+        self.options['buffer'] = self.get_buffer(selections=True)
 
         self.call()
 
@@ -686,16 +1615,27 @@ class PyMdownCriticCommand(PyMdownCommand):
         self.convert()
 
     def convert(self):
-        """Convert the buffer."""
+        """
+        Convert the buffer.
+
+        Accepting and rejecting is done right here by the plugin unless `critic_engine` is `pymdown`.
+        Viewing always needs pymdown.
+        """
+
+        if self.mode != 'view' and get_settings().critic_engine != 'pymdown':
+            start = time.perf_counter()
+            text = self.get_buffer()
+            results = critic_dump(text, self.mode)
+            stats.record(self.name(), {'total': time.perf_counter() - start}, len(text), len(results))
+            del text
+            self.callback(results, False)
+            return
 
         self.options['critic_dump'] = True
         self.options['quiet'] = True
         self.options['force_stdout'] = True
         self.options['critic_mode'] = self.mode
-        bfr = []
-        for line in self.view.lines(sublime.Region(0, self.view.size())):
-            bfr.append(self.view.substr(line) + '\n')
-        self.options['buffer'] = bfr
+        self.options['buffer'] = self.get_buffer()
         self.call()
 
     def callback(self, results, err):
@@ -719,3 +1659,291 @@ class PyMdownCriticCommand(PyMdownCommand):
                 error("Original view appears to be missing!")
             else:
                 notify("Critic stripping succesfully completed!")
+
+
+###############################
+# Live Preview
+###############################
+class PyMdownLivePreview(object):
+
+    """
+    Track live previews and write their output.
+
+    Which views have a live preview is only kept in memory, so previews
+    don't come back on their own when Sublime is restarted.
+    """
+
+    enabled = {}
+    edits = {}
+    versions = {}
+
+    @classmethod
+    def is_enabled(cls, view_id):
+        """Check if the view has a live preview."""
+
+        return view_id in cls.enabled
+
+    @classmethod
+    def enable(cls, view_id, alternate_settings=None):
+        """Start a live preview of the view with the given alternate settings file."""
+
+        cls.enabled[view_id] = alternate_settings
+
+    @classmethod
+    def get_paths(cls, view_id):
+        """Get the preview file and its reload script."""
+
+        folder = join(tempfile.gettempdir(), 'PyMdown')
+        return join(folder, 'preview-%d.html' % view_id), join(folder, 'preview-%d.js' % view_id)
+
+    @classmethod
+    def touch(cls, view_id):
+        """Count an edit and return the count."""
+
+        count = cls.edits.get(view_id, 0) + 1
+        cls.edits[view_id] = count
+        return count
+
+    @classmethod
+    def is_latest(cls, view_id, count):
+        """Check if there have been no edits since the given count."""
+
+        return cls.edits.get(view_id, 0) == count
+
+    @classmethod
+    def write(cls, view_id, html):
+        """
+        Write the render to the preview file and bump its version.
+
+        Returns whether this was the first render (i.e. the browser needs opening).
+        """
+
+        import os
+        html_path, script_path = cls.get_paths(view_id)
+        folder = dirname(html_path)
+        if not exists(folder):
+            os.makedirs(folder)
+        first = view_id not in cls.versions
+        version = cls.versions.get(view_id, 0) + 1
+        cls.versions[view_id] = version
+
+        script = LIVE_RELOAD_SCRIPT % {
+            "version": version,
+            "view": view_id,
+            "script": basename(script_path),
+            "interval": get_settings().live_preview_poll
+        }
+        index = html.rfind('</body>')
+        if index == -1:
+            html += script
+        else:
+            html = html[:index] + script + html[index:]
+        with open(html_path, 'w', encoding='utf-8') as f:
+            f.write(html)
+        with open(script_path, 'w', encoding='utf-8') as f:
+            f.write('pymdownLiveReload(%d);\n' % version)
+        return first
+
+    @classmethod
+    def close(cls, view_id):
+        """Stop tracking a view's live preview and remove its preview files."""
+
+        import os
+        cls.enabled.pop(view_id, None)
+        cls.edits.pop(view_id, None)
+        cls.versions.pop(view_id, None)
+        scheduler.cancel(('PyMdownLivePreviewCommand', view_id))
+        PyMdownPreviewServer.remove(view_id)
+        for path in cls.get_paths(view_id):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class PyMdownLivePreviewCommand(PyMdownCommand):
+
+    """Toggle or refresh a live preview of the view."""
+
+    message = "pymdown failed to generate the live preview!"
+
+    def run(self, edit, action='toggle', alternate_settings=None):
+        """Run the command."""
+
+        view_id = self.view.id()
+        if action == 'toggle':
+            if PyMdownLivePreview.is_enabled(view_id):
+                PyMdownLivePreview.close(view_id)
+                notify("Live preview disabled.")
+                return
+            PyMdownLivePreview.enable(view_id, alternate_settings)
+        elif not PyMdownLivePreview.is_enabled(view_id):
+            return
+
+        self.setup(PyMdownLivePreview.enabled.get(view_id))
+        self.convert()
+
+    def convert(self):
+        """Convert the buffer."""
+
+        self.options['quiet'] = True
+        self.options['force_stdout'] = True
+        self.options['buffer'] = self.get_buffer()
+        self.call()
+
+    def callback(self, results, err):
+        """Callback after conversion."""
+
+        if err:
+            log(handle_line_endings(results))
+            status_notify(self.message)
+            return
+
+        view_id = self.view.id()
+        if not PyMdownLivePreview.is_enabled(view_id):
+            return
+        server = PyMdownPreviewServer.get()
+        if server is not None:
+            first = server.get(view_id) is None
+            server.publish(view_id, results)
+            if first and not server.is_watched(view_id):
+                webbrowser.open_new_tab(server.url(view_id))
+                notify("Live preview enabled.")
+            return
+        try:
+            if PyMdownLivePreview.write(view_id, results):
+                webbrowser.open_new_tab('file://' + PyMdownLivePreview.get_paths(view_id)[0])
+                notify("Live preview enabled.")
+        except Exception:
+            log(traceback.format_exc())
+            status_notify(self.message)
+
+
+class PyMdownLivePreviewListener(sublime_plugin.EventListener):
+
+    """Re-render live previews when their views are modified."""
+
+    def on_modified_async(self, view):
+        """Debounce edits and render once the view has been idle for a moment."""
+
+        view_id = view.id()
+        if not PyMdownLivePreview.is_enabled(view_id):
+            return
+        count = PyMdownLivePreview.touch(view_id)
+        delay = get_settings().live_preview_delay
+
+        def render():
+            if PyMdownLivePreview.is_latest(view_id, count):
+                view.run_command('py_mdown_live_preview', {'action': 'render'})
+
+        sublime.set_timeout(render, delay)
+
+    def on_close(self, view):
+        """Stop tracking closed views."""
+
+        PyMdownLivePreview.close(view.id())
+
+
+class PyMdownRefreshEnvironmentCommand(sublime_plugin.ApplicationCommand):
+
+    """Refresh the cached login shell environment and pymdown binary."""
+
+    def run(self):
+        """Run the command."""
+
+        PyMdownEnviron.refresh()
+        PyMdownBinary.refresh()
+        notify("Refreshing environment...")
+
+
+class PyMdownStatsCommand(sublime_plugin.WindowCommand):
+
+    """Show conversion statistics in an output panel."""
+
+    def run(self, clear=False):
+        """Run the command."""
+
+        if clear:
+            stats.clear()
+            notify("Conversion stats cleared.")
+            return
+        panel = self.window.create_output_panel('pymdown_stats')
+        panel.run_command('append', {'characters': stats.report()})
+        self.window.run_command('show_panel', {'panel': 'output.pymdown_stats'})
+
+
+class PyMdownClearCacheCommand(sublime_plugin.ApplicationCommand):
+
+    """Clear the render cache."""
+
+    def run(self):
+        """Run the command."""
+
+        render_cache.clear()
+        partial_renderer.clear()
+        notify("Render cache cleared.")
+
+
+class PyMdownCancelCommand(sublime_plugin.ApplicationCommand):
+
+    """Cancel all queued and running conversions, killing their process trees."""
+
+    def run(self):
+        """Run the command."""
+
+        count = scheduler.cancel_all()
+        notify("Cancelled %d running conversion(s)." % count)
+
+
+###############################
+# Plugin Loading
+###############################
+def configure_render_cache(settings):
+    """Configure the render cache from the settings."""
+
+    megabyte = 1024 * 1024
+    render_cache.configure(
+        int(settings.render_cache_size * megabyte),
+        join(sublime.cache_path(), 'PyMdown', 'render') if settings.render_cache_disk else None,
+        int(settings.render_cache_disk_size * megabyte)
+    )
+
+
+def on_settings_change():
+    """Reset cached state that depends on the settings."""
+
+    settings = PyMdownSettings.refresh()
+    PyMdownEnviron.refresh()
+    PyMdownBinary.refresh()
+    PyMdownDaemonManager.stop()
+    PyMdownAsyncio.stop()
+    PyMdownPreviewServer.stop()
+    scheduler.resize(settings.max_workers)
+    render_cache.clear()
+    partial_renderer.clear()
+    configure_render_cache(settings)
+    discovery.clear()
+
+
+def plugin_loaded():
+    """Setup plugin."""
+
+    settings = sublime.load_settings("pymdown.sublime-settings")
+    settings.clear_on_change('pymdown')
+    settings.add_on_change('pymdown', on_settings_change)
+    settings = PyMdownSettings.refresh()
+    scheduler.resize(settings.max_workers)
+    configure_render_cache(settings)
+    PyMdownDaemonManager.load()
+    PyMdownEnviron.refresh()
+    PyMdownBinary.refresh()
+
+
+def plugin_unloaded():
+    """Tear down plugin."""
+
+    sublime.load_settings("pymdown.sublime-settings").clear_on_change('pymdown')
+    scheduler.shutdown()
+    PyMdownDaemonManager.stop()
+    PyMdownAsyncio.stop()
+    PyMdownPreviewServer.stop()
@@ -0,0 +1,103 @@
+"""Test batch conversion."""
+import unittest
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from lib.batch import expand_paths, convert_files, chunk_files, arg_length, BatchResult
+from lib.progress import BatchProgress
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAKE_PYMDOWN = os.path.join(ROOT, 'benchmarks', 'fake_pymdown.py')
+
+
+def execute(cmd):
+    """Run a command and return the return code and output."""
+
+    p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    output = p.communicate()[0].decode('utf-8')
+    return p.returncode, output
+
+
+class TestBatch(unittest.TestCase):
+
+    """Test batch conversion."""
+
+    def setUp(self):
+        """Setup folders of Markdown files."""
+
+        self.tempdir = tempfile.mkdtemp()
+        self.files = []
+        for folder in ('one', 'two', 'three'):
+            os.makedirs(os.path.join(self.tempdir, folder))
+            for name in ('a.md', 'b.md'):
+                path = os.path.join(self.tempdir, folder, name)
+                with open(path, 'w') as f:
+                    f.write('# Test\n')
+                self.files.append(path)
+        self.paths = [os.path.join(self.tempdir, folder) for folder in ('one', 'two', 'three')]
+
+    def tearDown(self):
+        """Remove the folders."""
+
+        shutil.rmtree(self.tempdir)
+
+    def test_chunks(self):
+        """Test that files are spread over the requested chunks and stay under the limit."""
+
+        files = ['file%03d.md' % i for i in range(100)]
+        chunks = chunk_files(files, ['pymdown', '-b'], 1000000, chunks=4)
+        self.assertEqual([len(c) for c in chunks], [25, 25, 25, 25])
+        self.assertEqual(sum(chunks, []), files)
+
+        limit = sum(arg_length(a) for a in ['pymdown', '-b'] + files[:10])
+        chunks = chunk_files(files, ['pymdown', '-b'], limit, chunks=1)
+        self.assertEqual(len(chunks), 10)
+        self.assertEqual(sum(chunks, []), files)
+
+        chunks = chunk_files(files, ['pymdown', '-b'], 1000000, chunks=1, max_files=30)
+        self.assertEqual([len(c) for c in chunks], [30, 30, 30, 10])
+
+    def test_progress(self):
+        """Test that every finished chunk is reported and ends up in the report."""
+
+        files = expand_paths(self.paths, ['*.md'])
+        progress = BatchProgress(len(files))
+        convert_files(
+            files, [sys.executable, FAKE_PYMDOWN, '-b'], execute,
+            workers=2, max_files=4, on_result=progress.update
+        )
+        progress.finish()
+        self.assertEqual(progress.done, len(files))
+        report = json.loads(progress.report())
+        self.assertEqual(report['converted'], len(files))
+        self.assertEqual(sorted(sum((c['files'] for c in report['chunks']), [])), sorted(files))
+
+
+class TestBatchProgress(unittest.TestCase):
+
+    """Test batch progress."""
+
+    def test_status(self):
+        """Test throughput, ETA, and failures."""
+
+        now = [0.0]
+        progress = BatchProgress(10, clock=lambda: now[0])
+        self.assertIn('ETA ?', progress.status())
+        now[0] = 2.0
+        progress.update(BatchResult(['a', 'b', 'c', 'd'], 0, '', 2.0))
+        self.assertEqual(progress.status(), '4/10 files, 2.0 files/s, ETA 3s')
+        now[0] = 3.0
+        result = BatchResult(['e', 'f'], 1, '', 1.0)
+        result.failed = ['f']
+        progress.update(result)
+        self.assertEqual(progress.status(), '6/10 files, 2.0 files/s, ETA 2s, 1 failed')
+
+        report = json.loads(progress.report())
+        self.assertEqual((report['converted'], report['failed']), (5, 1))
+        self.assertEqual(
+            report['chunks'][0], {'files': ['a', 'b', 'c', 'd'], 'duration': 2.0, 'returncode': 0, 'failed': []}
+        )
+        self.assertEqual(report['chunks'][1]['failed'], ['f'])
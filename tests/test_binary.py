@@ -0,0 +1,73 @@
+"""Test binary resolution."""
+import unittest
+import os
+import shutil
+import stat
+import sys
+import tempfile
+from lib.binary import BinaryResolver, BinaryError
+
+FAKE = '''#!%s
+import sys
+if sys.argv[1] == '--version':
+    print('pymdown %s')
+else:
+    print('usage: pymdown [-h] [-P] [--force-stdout] [file]')
+'''
+
+
+@unittest.skipIf(sys.platform.startswith('win'), "Needs a shebang script")
+class TestBinaryResolver(unittest.TestCase):
+
+    """Test binary resolution."""
+
+    def setUp(self):
+        """Create a fake binary."""
+
+        self.folder = tempfile.mkdtemp()
+        self.env = dict(os.environ)
+        self.env['PATH'] = self.folder
+        self.write('0.8.0')
+
+    def tearDown(self):
+        """Remove the fake binary."""
+
+        shutil.rmtree(self.folder)
+
+    def write(self, version):
+        """Write the fake binary."""
+
+        path = os.path.join(self.folder, 'pymdown')
+        with open(path, 'w') as f:
+            f.write(FAKE % (sys.executable, version))
+        os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR)
+        return path
+
+    def test_probe(self):
+        """Test that the binary is found on the path and its options are probed."""
+
+        info = BinaryResolver().resolve('pymdown', self.env)
+        self.assertEqual(info.path, os.path.join(self.folder, 'pymdown'))
+        self.assertEqual(info.version, '0.8.0')
+        self.assertTrue(info.supports('-P'))
+        self.assertTrue(info.supports('--force-stdout'))
+        self.assertFalse(info.supports('--critic-dump'))
+        info.check([info.path, '-P', '--force-stdout'])
+        with self.assertRaises(BinaryError):
+            info.check([info.path, '--critic-dump'])
+
+    def test_missing(self):
+        """Test that a missing binary is reported."""
+
+        with self.assertRaises(BinaryError):
+            BinaryResolver().resolve('missing-pymdown', self.env)
+
+    def test_cache(self):
+        """Test that the probe is reused until the binary changes."""
+
+        resolver = BinaryResolver()
+        info = resolver.resolve('pymdown', self.env)
+        self.assertIs(resolver.resolve('pymdown', self.env), info)
+        path = self.write('0.9.0.1')
+        os.utime(path, (1, 1))
+        self.assertEqual(resolver.resolve('pymdown', self.env).version, '0.9.0.1')
@@ -0,0 +1,100 @@
+"""Test partial rendering."""
+import unittest
+from lib.blocks import PartialRenderer, split_blocks
+
+
+def render(text):
+    """Render each blank line separated chunk as a paragraph inside a page."""
+
+    body = []
+    for chunk in text.split('\n\n'):
+        chunk = chunk.strip('\n')
+        if chunk.startswith('<!--'):
+            body.append(chunk + '\n')
+        elif chunk and not chunk.startswith('['):
+            body.append('<p>%s</p>\n' % chunk)
+    return 0, '<html><body>\n%s</body></html>' % ''.join(body)
+
+
+class TestBlocks(unittest.TestCase):
+
+    """Test partial rendering."""
+
+    def test_split(self):
+        """Test that blocks are split on blank lines, but not inside fences, lists, or indented code."""
+
+        doc = split_blocks(
+            '---\ntitle: test\n---\n'
+            '# Header\n\n'
+            'Paragraph\ntext.\n\n'
+            '```\ncode\n\nmore code\n```\n\n'
+            '- item\n\n- item\n\n    continued\n\n'
+            '[link]: http://example.com\n'
+        )
+        self.assertEqual(doc.frontmatter, '---\ntitle: test\n---\n')
+        self.assertEqual(
+            doc.blocks,
+            [
+                '# Header\n',
+                'Paragraph\ntext.\n',
+                '```\ncode\n\nmore code\n```\n',
+                '- item\n\n- item\n\n    continued\n'
+            ]
+        )
+        self.assertEqual(doc.definitions, ['[link]: http://example.com'])
+
+    def test_unsupported(self):
+        """Test that documents with footnotes and such are not split."""
+
+        self.assertIsNone(split_blocks('Text[^1]\n\n[^1]: Footnote\n'))
+        self.assertIsNone(split_blocks('[TOC]\n\n# Header\n'))
+        self.assertIsNone(split_blocks('<div>\n\ntext\n\n</div>\n'))
+
+    def test_render(self):
+        """Test that only changed blocks are rendered, and the result matches a full render."""
+
+        calls = []
+
+        def counted(text):
+            calls.append(text)
+            return render(text)
+
+        renderer = PartialRenderer()
+        text = 'one\n\ntwo\n\nthree\n'
+        self.assertEqual(renderer.render(text, 'cmd', counted), render(text))
+        text = 'one\n\n2\n\nthree\n'
+        self.assertEqual(renderer.render(text, 'cmd', counted), render(text))
+        self.assertEqual(len(calls), 2)
+        self.assertNotIn('one', calls[1])
+        self.assertNotIn('three', calls[1])
+
+        # Nothing changed, so nothing is rendered.
+        renderer.render(text, 'cmd', counted)
+        self.assertEqual(len(calls), 2)
+
+        # Different options render again.
+        renderer.render(text, 'other', counted)
+        self.assertEqual(len(calls), 3)
+
+    def test_definitions(self):
+        """Test that blocks are rendered again when a definition they use changes."""
+
+        calls = []
+
+        def counted(text):
+            calls.append(text)
+            return render(text)
+
+        renderer = PartialRenderer()
+        renderer.render('[a] link\n\nother\n\n[a]: http://a.com\n', 'cmd', counted)
+        self.assertIn('[a]: http://a.com', calls[0])
+        renderer.render('[a] link\n\nother\n\n[a]: http://b.com\n', 'cmd', counted)
+        self.assertIn('[a] link', calls[1])
+        self.assertNotIn('other', calls[1])
+
+    def test_failure(self):
+        """Test that failed renders are returned and not cached."""
+
+        renderer = PartialRenderer()
+        self.assertEqual(renderer.render('text\n', 'cmd', lambda text: (1, 'error')), (1, 'error'))
+        self.assertEqual(renderer.render('text\n', 'cmd', render), render('text\n'))
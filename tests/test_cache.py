@@ -0,0 +1,42 @@
+"""Test render cache."""
+import unittest
+import shutil
+import tempfile
+from lib.cache import RenderCache, make_key
+
+
+class TestRenderCache(unittest.TestCase):
+
+    """Test render cache."""
+
+    def test_key(self):
+        """Test that keys depend on the command and the data."""
+
+        key = make_key(['pymdown', '-P'], b'text')
+        self.assertEqual(key, make_key(['pymdown', '-P'], b'text'))
+        self.assertNotEqual(key, make_key(['pymdown'], b'text'))
+        self.assertNotEqual(key, make_key(['pymdown', '-P'], b'texts'))
+
+    def test_lru(self):
+        """Test that the least recently used renders are evicted first."""
+
+        cache = RenderCache(max_size=10)
+        cache.set('a', '1234')
+        cache.set('b', '1234')
+        cache.get('a')
+        cache.set('c', '1234')
+        self.assertEqual(cache.get('a'), '1234')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), '1234')
+
+    def test_disk(self):
+        """Test that renders evicted from memory are found on disk."""
+
+        folder = tempfile.mkdtemp()
+        try:
+            cache = RenderCache(max_size=4, folder=folder)
+            cache.set('a', '1234')
+            cache.set('b', '1234')
+            self.assertEqual(cache.get('a'), '1234')
+        finally:
+            shutil.rmtree(folder)
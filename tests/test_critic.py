@@ -0,0 +1,36 @@
+"""Test CriticMarkup processing."""
+import unittest
+import codecs
+import os
+from lib.critic import critic_dump
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'critic')
+
+
+def read(name):
+    """Read a corpus file."""
+
+    with codecs.open(os.path.join(CORPUS, name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+class TestCritic(unittest.TestCase):
+
+    """Test CriticMarkup processing."""
+
+    def test_corpus(self):
+        """Test that accepting and rejecting gives the same results as `pymdown --critic-dump`."""
+
+        for name in sorted(os.listdir(CORPUS)):
+            if name.count('.') != 1:
+                continue
+            base = os.path.splitext(name)[0]
+            text = read(name)
+            for mode in ('accept', 'reject'):
+                self.assertEqual(critic_dump(text, mode), read('%s.%s.md' % (base, mode)), '%s %s' % (name, mode))
+
+    def test_invalid_mode(self):
+        """Test that only accept and reject are handled."""
+
+        with self.assertRaises(ValueError):
+            critic_dump('text', 'view')
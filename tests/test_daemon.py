@@ -0,0 +1,115 @@
+"""Test the PyMdown conversion daemon."""
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from lib.daemon import PyMdownDaemon, PyMdownDaemonPool, DaemonError
+from lib.process import new_group_kwargs
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVER = os.path.join(ROOT, 'lib', 'pymdown_server.py')
+
+# Fake entry point: upper cases stdin, sleeps on request, and crashes once if asked.
+ENTRY = '''
+import os
+import sys
+import time
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == '--crash-once' and not os.path.exists(args[1]):
+        open(args[1], 'w').close()
+        os._exit(1)
+    if args and args[0] == '--sleep':
+        time.sleep(float(args[1]))
+    sys.stdout.write(sys.stdin.read().upper())
+    sys.stderr.write('warning\\n')
+    return 2 if args and args[0] == '--fail' else 0
+'''
+
+
+class TestDaemon(unittest.TestCase):
+
+    """Test the PyMdown conversion daemon."""
+
+    def setUp(self):
+        """Write the fake entry point."""
+
+        self.tempdir = tempfile.mkdtemp()
+        with open(os.path.join(self.tempdir, 'fake_entry.py'), 'w') as f:
+            f.write(ENTRY)
+        self.env = dict(os.environ)
+        self.env['PYTHONPATH'] = self.tempdir
+        self.cmd = [sys.executable, SERVER, 'fake_entry:main']
+
+    def tearDown(self):
+        """Remove the fake entry point."""
+
+        shutil.rmtree(self.tempdir)
+
+    def test_protocol(self):
+        """Test that conversions return the return code, stdout, and stderr."""
+
+        daemon = PyMdownDaemon(self.cmd, env=self.env)
+        try:
+            self.assertEqual(daemon.request([], 'tést'.encode('utf-8')), (0, 'TÉST'.encode('utf-8'), b'warning\n'))
+            self.assertEqual(daemon.request(['--fail'], b'')[0], 2)
+            self.assertEqual(daemon.request([], b'again')[1], b'AGAIN')
+        finally:
+            daemon.stop()
+
+    def test_crash_restart(self):
+        """Test that a crashed server is restarted and the request is tried again."""
+
+        daemon = PyMdownDaemon(self.cmd, env=self.env)
+        try:
+            daemon.request([], b'start')
+            pid = daemon.process.pid
+            marker = os.path.join(self.tempdir, 'crashed')
+            self.assertEqual(daemon.request(['--crash-once', marker], b'text')[1], b'TEXT')
+            self.assertTrue(os.path.exists(marker))
+            self.assertNotEqual(daemon.process.pid, pid)
+        finally:
+            daemon.stop()
+
+    def test_pool(self):
+        """Test that a slow conversion doesn't hold up others."""
+
+        pool = PyMdownDaemonPool(self.cmd, 2, env=self.env)
+        try:
+            thread = threading.Thread(target=pool.request, args=(['--sleep', '2'], b''))
+            thread.start()
+            time.sleep(0.2)
+            start = time.time()
+            self.assertEqual(pool.request([], b'quick', 5)[1], b'QUICK')
+            self.assertLess(time.time() - start, 1.5)
+            thread.join()
+        finally:
+            pool.stop()
+
+    def test_stop_during_request(self):
+        """Test that stopping the pool kills a request in progress instead of waiting for it."""
+
+        pool = PyMdownDaemonPool(self.cmd, 1, env=self.env, **new_group_kwargs())
+        errors = []
+
+        def request():
+            try:
+                pool.request(['--sleep', '8'], b'')
+            except DaemonError as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=request)
+        thread.start()
+        time.sleep(0.5)
+        start = time.time()
+        pool.stop()
+        self.assertLess(time.time() - start, 1)
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(len(errors), 1)
+        self.assertRaises(DaemonError, pool.request, [], b'')
@@ -0,0 +1,85 @@
+"""Test batch file discovery."""
+import unittest
+import os
+import shutil
+import tempfile
+from lib.discovery import FileDiscovery
+
+PATTERNS = ['*.[mM][dD]', '*.md', '*.[mM][aA][rR][kK][dD][oO][wW][nN]']
+
+
+class TestDiscovery(unittest.TestCase):
+
+    """Test batch file discovery."""
+
+    def setUp(self):
+        """Setup a tree of files."""
+
+        self.tempdir = tempfile.mkdtemp()
+        for name in (
+            'a.md', 'b.markdown', 'c.txt',
+            os.path.join('sub', 'd.md'),
+            os.path.join('.git', 'e.md'),
+            os.path.join('node_modules', 'pkg', 'f.md')
+        ):
+            self.touch(name)
+        self.discovery = FileDiscovery()
+
+    def tearDown(self):
+        """Remove the tree."""
+
+        shutil.rmtree(self.tempdir)
+
+    def touch(self, name):
+        """Create a file in the tree."""
+
+        path = os.path.join(self.tempdir, name)
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write('# Test\n')
+
+    def find(self, paths=None, **kwargs):
+        """Find files and return their paths relative to the tree."""
+
+        files = self.discovery.find(paths or [self.tempdir], PATTERNS, ['.git', 'node_modules'], **kwargs)
+        return [os.path.relpath(f, self.tempdir) for f in files]
+
+    def test_recursive(self):
+        """Test that each file is found once, and ignored folders are skipped."""
+
+        self.assertEqual(self.find(), ['a.md', 'b.markdown', os.path.join('sub', 'd.md')])
+
+    def test_not_recursive(self):
+        """Test only searching the top folder."""
+
+        self.assertEqual(self.find(recursive=False), ['a.md', 'b.markdown'])
+
+    def test_overlapping_paths(self):
+        """Test that files reachable from several paths are only found once."""
+
+        paths = [os.path.join(self.tempdir, 'sub'), self.tempdir, os.path.join(self.tempdir, 'a.md')]
+        self.assertEqual(self.find(paths), [os.path.join('sub', 'd.md'), 'a.md', 'b.markdown'])
+
+    def test_index(self):
+        """Test that new files are found after the folder was indexed."""
+
+        self.find()
+        self.touch(os.path.join('sub', 'g.md'))
+        self.assertIn(os.path.join('sub', 'g.md'), self.find())
+
+    def test_path_patterns(self):
+        """Test that patterns with a path are matched relative to the selected folder."""
+
+        files = self.discovery.find([self.tempdir], ['sub/*.md'], ['.git', 'node_modules'])
+        self.assertEqual([os.path.relpath(f, self.tempdir) for f in files], [os.path.join('sub', 'd.md')])
+        files = self.discovery.find([self.tempdir], PATTERNS, ['.git', 'node_modules', 'sub/d.md'])
+        self.assertEqual([os.path.relpath(f, self.tempdir) for f in files], ['a.md', 'b.markdown'])
+
+    @unittest.skipIf(not hasattr(os, 'symlink') or os.name == 'nt', "Symlinks need privileges on Windows")
+    def test_symlinks(self):
+        """Test that files reachable through symlinks are only found once."""
+
+        os.symlink(os.path.join(self.tempdir, 'sub'), os.path.join(self.tempdir, 'link'))
+        os.symlink(os.path.join(self.tempdir, 'a.md'), os.path.join(self.tempdir, 'z.md'))
+        self.assertEqual(self.find(), ['a.md', 'b.markdown', os.path.join('link', 'd.md')])
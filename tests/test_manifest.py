@@ -0,0 +1,89 @@
+"""Test incremental build manifest."""
+import unittest
+import os
+import shutil
+import tempfile
+from lib.manifest import BuildManifest
+
+
+class TestManifest(unittest.TestCase):
+
+    """Test incremental build manifest."""
+
+    def setUp(self):
+        """Setup temporary folder."""
+
+        self.tempdir = tempfile.mkdtemp()
+        self.manifest = os.path.join(self.tempdir, 'cache', 'manifest.json')
+        self.source = os.path.join(self.tempdir, 'test.md')
+        self.write(self.source, '# Test\n')
+
+    def tearDown(self):
+        """Remove temporary folder."""
+
+        shutil.rmtree(self.tempdir)
+
+    def write(self, path, text, mtime=None):
+        """Write a file."""
+
+        with open(path, 'w') as f:
+            f.write(text)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+
+    def build(self, config=None):
+        """Record the source in a fresh manifest."""
+
+        manifest = BuildManifest(self.manifest, config or {"critic_mode": "view"})
+        dirty = manifest.is_dirty(self.source)
+        manifest.record(self.source)
+        manifest.save()
+        return dirty
+
+    def test_unchanged(self):
+        """Test that unchanged files are clean."""
+
+        self.assertTrue(self.build())
+        self.assertFalse(self.build())
+
+    def test_touched(self):
+        """Test that touched, but unchanged, files are clean."""
+
+        self.build()
+        self.write(self.source, '# Test\n', mtime=1000)
+        self.assertFalse(self.build())
+
+    def test_changed(self):
+        """Test that changed files are dirty."""
+
+        self.build()
+        self.write(self.source, '# Tess\n', mtime=1000)
+        self.assertTrue(self.build())
+
+    def test_config(self):
+        """Test that a config change makes everything dirty."""
+
+        self.build()
+        self.assertTrue(self.build({"critic_mode": "accept"}))
+
+    def test_output_removed(self):
+        """Test that files whose output went missing are dirty."""
+
+        output = os.path.join(self.tempdir, 'test.html')
+        self.write(output, '<h1>Test</h1>\n')
+        self.build()
+        os.remove(output)
+        self.assertTrue(self.build())
+
+    def test_config_folder(self):
+        """Test that editing a file in PyMdown's folder makes everything dirty."""
+
+        folder = os.path.join(self.tempdir, '.PyMdown')
+        os.makedirs(os.path.join(folder, 'templates'))
+        template = os.path.join(folder, 'templates', 'default.html')
+        self.write(template, '<html></html>\n', mtime=1000)
+        config = {"critic_mode": "view", "config_folder": folder}
+        self.build(config)
+        self.assertFalse(self.build(config))
+        self.write(template, '<html><body></body></html>\n', mtime=2000)
+        self.assertTrue(self.build(config))
@@ -0,0 +1,101 @@
+"""Test job scheduler."""
+import unittest
+import threading
+from concurrent.futures import Future
+from lib.scheduler import JobScheduler
+
+
+class TestScheduler(unittest.TestCase):
+
+    """Test job scheduler."""
+
+    def setUp(self):
+        """Setup scheduler."""
+
+        self.scheduler = JobScheduler(workers=1)
+        self.gate = threading.Event()
+        self.done = threading.Event()
+        self.results = []
+
+    def tearDown(self):
+        """Shutdown scheduler."""
+
+        self.gate.set()
+        self.scheduler.shutdown()
+
+    def blocker(self):
+        """Block the worker until the gate opens."""
+
+        self.gate.wait(5)
+
+    def test_replace_pending_job(self):
+        """Test that a newer job replaces a queued job with the same key."""
+
+        self.scheduler.submit(self.blocker)
+        first = self.scheduler.submit(lambda: self.results.append(1), key='view')
+        self.scheduler.submit(lambda: self.results.append(2), key='view')
+        self.scheduler.submit(self.done.set)
+        self.assertTrue(first.cancelled)
+        self.gate.set()
+        self.assertTrue(self.done.wait(5))
+        self.assertEqual(self.results, [2])
+
+    def test_cancel_running_job(self):
+        """Test that submitting with the key of a running job cancels it."""
+
+        cancelled = threading.Event()
+        started = threading.Event()
+
+        def running():
+            started.set()
+            self.gate.wait(5)
+
+        self.scheduler.resize(2)
+        self.scheduler.submit(running, key='view', cancel=cancelled.set)
+        self.assertTrue(started.wait(5))
+        self.scheduler.submit(self.done.set, key='view')
+        self.assertTrue(cancelled.is_set())
+        self.assertTrue(self.done.wait(5))
+
+    def test_cancel_all(self):
+        """Test cancelling everything."""
+
+        cancelled = threading.Event()
+        started = threading.Event()
+
+        def running():
+            started.set()
+            self.gate.wait(5)
+
+        self.scheduler.submit(running, cancel=cancelled.set)
+        queued = self.scheduler.submit(lambda: self.results.append(1))
+        self.assertTrue(started.wait(5))
+        self.assertEqual(self.scheduler.cancel_all(), 1)
+        self.assertTrue(cancelled.is_set())
+        self.assertTrue(queued.cancelled)
+
+    def test_background_job(self):
+        """Test that a job returning a future frees its thread but keeps running until the future is done."""
+
+        future = Future()
+        cancelled = threading.Event()
+        self.scheduler.submit(lambda: future, key='view', cancel=cancelled.set)
+        self.scheduler.submit(self.done.set)
+        self.assertTrue(self.done.wait(5))
+        self.scheduler.submit(lambda: None, key='view')
+        self.assertTrue(cancelled.is_set())
+        future.set_result(None)
+
+    def test_errors_logged(self):
+        """Test that job errors are passed to the scheduler's log function."""
+
+        logged = []
+        scheduler = JobScheduler(workers=1, log=logged.append)
+        try:
+            scheduler.submit(lambda: 1 / 0)
+            scheduler.submit(self.done.set)
+            self.assertTrue(self.done.wait(5))
+        finally:
+            scheduler.shutdown()
+        self.assertEqual(len(logged), 1)
+        self.assertIn('ZeroDivisionError', logged[0])
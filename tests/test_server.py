@@ -0,0 +1,62 @@
+"""Test the preview server."""
+import unittest
+import http.client
+from lib.server import PreviewServer
+
+
+class TestPreviewServer(unittest.TestCase):
+
+    """Test the preview server."""
+
+    def setUp(self):
+        """Start the server."""
+
+        self.server = PreviewServer()
+
+    def tearDown(self):
+        """Stop the server."""
+
+        self.server.stop()
+
+    def request(self, path, host=None):
+        """Make a request and return the response."""
+
+        conn = http.client.HTTPConnection('127.0.0.1', self.server.port, timeout=5)
+        headers = {'Host': host} if host is not None else {}
+        conn.request('GET', path, headers=headers)
+        return conn.getresponse()
+
+    def test_page(self):
+        """Test that the latest render is served with the reload script."""
+
+        self.server.publish(1, '<html><body><p>one</p></body></html>')
+        self.server.publish(1, '<html><body><p>two</p></body></html>')
+        response = self.request(self.server.path('view', 1))
+        self.assertEqual(response.status, 200)
+        html = response.read().decode('utf-8')
+        self.assertIn('<p>two</p>', html)
+        self.assertIn(self.server.path('events', 1), html)
+        self.assertTrue(html.endswith('</script>\n</body></html>'))
+
+    def test_forbidden(self):
+        """Test that unknown tokens, views, and hosts are refused."""
+
+        self.server.publish(1, 'text')
+        self.assertEqual(self.request('/wrong/view/1').status, 404)
+        self.assertEqual(self.request(self.server.path('view', 2)).status, 404)
+        self.assertEqual(self.request(self.server.path('view', 1), host='evil.com').status, 403)
+
+    def test_events(self):
+        """Test that new renders are pushed and removing the view closes the stream."""
+
+        self.server.publish(1, 'one')
+        response = self.request(self.server.path('events', 1))
+        self.assertEqual(response.getheader('Content-Type'), 'text/event-stream')
+        self.assertEqual(response.fp.readline(), b'data: 1\n')
+        response.fp.readline()
+        self.assertTrue(self.server.is_watched(1))
+        self.server.publish(1, 'two')
+        self.assertEqual(response.fp.readline(), b'data: 2\n')
+        response.fp.readline()
+        self.server.remove(1)
+        self.assertEqual(response.fp.readline(), b'event: close\n')
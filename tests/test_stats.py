@@ -0,0 +1,18 @@
+"""Test conversion statistics."""
+import unittest
+from lib.stats import percentile
+
+
+class TestStats(unittest.TestCase):
+
+    """Test conversion statistics."""
+
+    def test_percentile(self):
+        """Test that percentiles use the nearest rank."""
+
+        self.assertEqual(percentile(list(range(1, 11)), 50), 5)
+        self.assertEqual(percentile(list(range(1, 101)), 95), 95)
+        self.assertEqual(percentile(list(range(1, 101)), 99), 99)
+        self.assertEqual(percentile(list(range(1, 101)), 100), 100)
+        self.assertEqual(percentile([3, 1, 2], 0), 1)
+        self.assertEqual(percentile([7], 50), 7)
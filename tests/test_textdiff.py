@@ -0,0 +1,60 @@
+"""Test text diffing."""
+import unittest
+import time
+from lib.textdiff import line_hunks, apply_hunks
+
+
+class TestTextDiff(unittest.TestCase):
+
+    """Test text diffing."""
+
+    def check(self, old, new):
+        """Check that the hunks turn the old text into the new text."""
+
+        hunks = line_hunks(old, new)
+        self.assertEqual(apply_hunks(old, hunks), new)
+        return hunks
+
+    def test_unchanged(self):
+        """Test that unchanged text has no hunks."""
+
+        self.assertEqual(self.check('a\nb\n', 'a\nb\n'), [])
+
+    def test_minimal(self):
+        """Test that only changed lines are replaced."""
+
+        old = ''.join('line %d\n' % i for i in range(1000))
+        new = old.replace('line 500\n', 'changed\n').replace('line 10\n', '')
+        self.assertEqual(
+            self.check(old, new),
+            [(old.index('line 10\n'), old.index('line 11\n'), ''),
+             (old.index('line 500\n'), old.index('line 501\n'), 'changed\n')]
+        )
+
+    def test_edges(self):
+        """Test changes at the start and end, and without a final newline."""
+
+        self.check('a\nb\nc', 'x\nb\nc\n')
+        self.check('a\nb\n', 'a\nb\nc')
+        self.check('', 'a\n')
+        self.check('a\n', '')
+        self.check('a\na\na\n', 'a\na\n')
+
+    def test_reordered(self):
+        """Test that moved and duplicated lines still give the right text."""
+
+        self.check('a\nb\nc\nd\ne\n', 'e\nb\nx\nd\na\n')
+        self.check('x\nx\ny\nx\n', 'y\nx\nx\nx\nx\n')
+        self.check(''.join('%d\n' % (i % 7) for i in range(500)), ''.join('%d\n' % (i % 5) for i in range(400)))
+
+    def test_scattered_timing(self):
+        """Test that changes spread through a large document are diffed quickly."""
+
+        old = ''.join(
+            ('line {++%d++} with a mark\n\n' if i % 100 == 0 else 'line %d\n\n') % i for i in range(10000)
+        )
+        new = old.replace('{++', '').replace('++}', '')
+        start = time.time()
+        hunks = self.check(old, new)
+        self.assertLess(time.time() - start, 1.0)
+        self.assertEqual(len(hunks), 100)
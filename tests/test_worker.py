@@ -0,0 +1,269 @@
+"""Test the conversion worker with stubbed Sublime modules and a fake binary."""
+import unittest
+import errno
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import bench  # noqa: E402
+import sublime  # noqa: E402
+
+
+@unittest.skipIf(sys.platform.startswith('win'), "The fake binary needs a shebang line")
+class TestWorker(unittest.TestCase):
+
+    """Test the conversion worker."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Load the plugin."""
+
+        cls.plugin = bench.load_plugin()
+
+    def setUp(self):
+        """Create the fake binary and a folder of Markdown files."""
+
+        self.tempdir = tempfile.mkdtemp()
+        self.binary = bench.make_binary(self.tempdir)
+        self.folder = os.path.join(self.tempdir, 'docs')
+        os.makedirs(self.folder)
+        self.configure()
+        self.pidfile = os.path.join(self.tempdir, 'pids')
+        env = dict(os.environ)
+        env['FAKE_PYMDOWN_PIDFILE'] = self.pidfile
+        self.plugin.PyMdownEnviron.env = env
+
+    def tearDown(self):
+        """Stop the asyncio backend and remove the files."""
+
+        self.plugin.PyMdownAsyncio.stop()
+        shutil.rmtree(self.tempdir)
+
+    def configure(self, **settings):
+        """Set the plugin's settings."""
+
+        platform = 'osx' if sys.platform == 'darwin' else 'linux'
+        values = {
+            'binary': {platform: self.binary},
+            'batch_convert_patterns': ['*.md'],
+            'render_cache_size': 0
+        }
+        values.update(settings)
+        sublime.SETTINGS['pymdown.sublime-settings'] = values
+        self.plugin.PyMdownSettings.refresh()
+
+    def write(self, name, text='# Test\n'):
+        """Write a Markdown file."""
+
+        path = os.path.join(self.folder, name)
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def assert_children_killed(self):
+        """Assert that the sleeping children of the fake binary are gone."""
+
+        with open(self.pidfile) as f:
+            pids = [int(line) for line in f if line.strip()]
+        self.assertTrue(pids)
+        time.sleep(0.2)
+        for pid in pids:
+            try:
+                os.kill(pid, 0)
+            except OSError as e:
+                self.assertEqual(e.errno, errno.ESRCH)
+            else:
+                # Reaped by nobody yet, but it must not be running.
+                with open('/proc/%d/stat' % pid) as f:
+                    self.assertEqual(f.read().split()[2], 'Z')
+
+    def run_worker(self, **kwargs):
+        """Run a worker and return it with its results and error status."""
+
+        results = []
+        done = threading.Event()
+
+        def callback(results_, err):
+            results.append((results_, err))
+            done.set()
+
+        worker = self.plugin.PyMdownWorker(callback=callback, **kwargs)
+        worker.run()
+        self.assertTrue(done.wait(10))
+        return worker, results[0][0], results[0][1]
+
+    def convert_batch(self, paths, **settings):
+        """Batch convert the paths through the worker and count the conversions of each file."""
+
+        self.configure(**settings)
+        lines = []
+        worker, results, err = self.run_worker(
+            paths=paths, batch=True, force=True, output_callback=lines.append
+        )
+        self.assertFalse(err)
+        return Counter(line.strip()[10:] for line in lines if line.startswith('Converted '))
+
+    def assert_each_file_once(self, **settings):
+        """Assert that overlapping selections convert every file exactly once."""
+
+        folders = ('one', 'two', 'three')
+        files = [self.write(os.path.join(folder, name)) for folder in folders for name in ('a.md', 'b.md')]
+        paths = [os.path.join(self.folder, folder) for folder in folders]
+        converted = self.convert_batch(paths + [self.folder, files[0]], **settings)
+        self.assertEqual(sorted(converted), sorted(files))
+        self.assertEqual(set(converted.values()), {1})
+
+    def test_each_file_once(self):
+        """Test that every file is converted exactly once on the thread backend."""
+
+        self.assert_each_file_once(batch_processes=2)
+
+    def test_each_file_once_asyncio(self):
+        """Test that every file is converted exactly once on the asyncio backend."""
+
+        self.assert_each_file_once(batch_processes=2, execution_backend='asyncio')
+
+    def test_failed_files(self):
+        """Test that only the files that failed in a chunk are counted as failed and converted again."""
+
+        self.configure(batch_processes=1)
+        files = [self.write('%02d.md' % i) for i in range(20)]
+        bad = self.write('05.md', 'FAIL\n')
+        worker, results, err = self.run_worker(paths=[self.folder], batch=True, quiet=True)
+        self.assertTrue(err)
+        self.assertEqual(worker.progress.failed, 1)
+        self.assertEqual(worker.progress.done, len(files))
+
+        worker, results, err = self.run_worker(paths=[self.folder], batch=True, quiet=True)
+        self.assertEqual(sum((r.paths for r in worker.file_results), []), [bad])
+
+    def test_large_buffer(self):
+        """Test that large buffers are converted through temp files."""
+
+        self.configure(large_document_size=0.0001)
+        text = ''.join('line %d <\n' % i for i in range(1000))
+        worker, results, err = self.run_worker(buffer=text, force_stdout=True, quiet=True)
+        self.assertFalse(err)
+        self.assertIn('spill', worker.timings)
+        self.assertEqual(results, ''.join('<p>line %d &lt;</p>\n' % i for i in range(1000)))
+
+    def test_buffer_timeout(self):
+        """Test that a buffer conversion that runs too long is killed with its children."""
+
+        self.configure(conversion_timeout=1)
+        start = time.time()
+        worker, results, err = self.run_worker(buffer='SLEEP 30\n', force_stdout=True, quiet=True)
+        self.assertLess(time.time() - start, 5)
+        self.assertTrue(err)
+        self.assertIn('timed out', results)
+        self.assert_children_killed()
+
+    def test_batch_timeout(self):
+        """Test that a batch that runs too long is killed with its children."""
+
+        self.configure(batch_timeout=1)
+        self.write('slow.md', 'SLEEP 30\n')
+        start = time.time()
+        worker, results, err = self.run_worker(paths=[self.folder], batch=True, quiet=True, force=True)
+        self.assertLess(time.time() - start, 5)
+        self.assertTrue(err)
+        self.assert_children_killed()
+
+    def test_batch_deadline(self):
+        """Test that chunks that haven't started when the batch times out are skipped."""
+
+        self.configure(batch_timeout=1, batch_processes=1, batch_files_per_process=1)
+        self.write('00.md', 'SLEEP 30\n')
+        for i in range(1, 5):
+            self.write('%02d.md' % i)
+        worker, results, err = self.run_worker(paths=[self.folder], batch=True, quiet=True, force=True)
+        self.assertTrue(err)
+        self.assertEqual([r.paths for r in worker.file_results], [[os.path.join(self.folder, '00.md')]])
+
+    def test_cancel(self):
+        """Test that cancelling a conversion kills it without calling back."""
+
+        results = []
+        worker = self.plugin.PyMdownWorker(
+            buffer='SLEEP 30\n', force_stdout=True, quiet=True, callback=lambda r, e: results.append(r)
+        )
+        thread = threading.Thread(target=worker.run)
+        start = time.time()
+        thread.start()
+        while not os.path.exists(self.pidfile) and time.time() - start < 5:
+            time.sleep(0.05)
+        worker.cancel()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertLess(time.time() - start, 5)
+        self.assertEqual(results, [])
+        self.assert_children_killed()
+
+    def test_asyncio_buffer(self):
+        """Test that a buffer conversion on the asyncio backend finishes in the background."""
+
+        self.configure(execution_backend='asyncio', conversion_timeout=1)
+        worker, results, err = self.run_worker(buffer='# Test\n', force_stdout=True, quiet=True)
+        self.assertFalse(err)
+        self.assertEqual(results, '<p># Test</p>\n')
+
+        worker = self.plugin.PyMdownWorker(buffer='SLEEP 30\n', force_stdout=True, quiet=True)
+        pending = worker.run()
+        self.assertFalse(pending.done())
+        self.assertEqual(pending.result(5), 1)
+        self.assertIn('timed out', worker.results)
+        self.assert_children_killed()
+
+    def test_asyncio_stop(self):
+        """Test that stopping the asyncio backend kills conversions in flight and finishes them."""
+
+        self.configure(execution_backend='asyncio', conversion_timeout=0)
+        worker = self.plugin.PyMdownWorker(buffer='SLEEP 30\n', force_stdout=True, quiet=True)
+        pending = worker.run()
+        start = time.time()
+        while not os.path.exists(self.pidfile) and time.time() - start < 5:
+            time.sleep(0.05)
+        self.plugin.PyMdownAsyncio.stop()
+        self.assertEqual(pending.result(5), 1)
+        self.assert_children_killed()
+
+    def test_daemon_source(self):
+        """Test that the daemon server source is loaded with the plugin, not on the worker thread."""
+
+        self.configure(
+            worker_mode='daemon', daemon_python={'linux': sys.executable, 'osx': sys.executable},
+            daemon_entry='fake_pymdown:main'
+        )
+        self.plugin.PyMdownEnviron.env['PYTHONPATH'] = os.path.join(ROOT, 'benchmarks')
+        self.plugin.PyMdownDaemonManager.source = None
+        load_resource = sublime.load_resource
+        try:
+            self.plugin.PyMdownDaemonManager.load()
+            sublime.load_resource = None
+            worker, results, err = self.run_worker(buffer='# Test\n', force_stdout=True, quiet=True)
+        finally:
+            sublime.load_resource = load_resource
+            self.plugin.PyMdownDaemonManager.stop()
+        self.assertFalse(err)
+        self.assertEqual(results, '<p># Test</p>\n')
+
+    def test_live_preview_close(self):
+        """Test that closing a live preview forgets it and removes its files."""
+
+        live = self.plugin.PyMdownLivePreview
+        live.enable(1000)
+        self.assertTrue(live.write(1000, '<html><body></body></html>'))
+        paths = live.get_paths(1000)
+        self.assertTrue(all(os.path.exists(p) for p in paths))
+        live.close(1000)
+        self.assertFalse(live.is_enabled(1000))
+        self.assertFalse(any(os.path.exists(p) for p in paths))